@@ -0,0 +1 @@
+"""Офлайн-бенчмарки бота (без Discord, Lavalink и Spotify)."""
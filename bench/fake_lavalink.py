@@ -0,0 +1,219 @@
+import asyncio
+import base64
+import hashlib
+import json
+import re
+import time
+import uuid
+from typing import Optional
+
+from aiohttp import web
+
+
+class FakeLavalink:
+    """Заглушка узла Lavalink v4: REST и websocket в объёме, который использует wavelink.
+
+    Поиск возвращает детерминированные треки, воспроизведение только
+    рассылает TrackStart/TrackEnd. Сами треки не заканчиваются - конец
+    трека вызывается явно через finish_all(), чтобы бенчмарк управлял нагрузкой.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, password: str = "bench",
+                 search_latency: float = 0.0, track_length: int = 180_000):
+        self.host = host
+        self.port = port
+        self.password = password
+        self.search_latency = search_latency
+        self.track_length = track_length
+        self.session_id = uuid.uuid4().hex[:16]
+        self.socket: Optional[web.WebSocketResponse] = None
+        self.ready = asyncio.Event()
+        self.tracks = {}  # encoded -> полезная нагрузка трека
+        self.players = {}  # guild_id -> encoded текущего трека или None
+        self.waiters = {}  # guild_id -> [Future], ждущие следующего запуска трека
+        self.counters = {"searches": 0, "plays": 0, "stops": 0, "events": 0}
+        self._runner: Optional[web.AppRunner] = None
+
+    @property
+    def uri(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/version", self.handle_version)
+        app.router.add_get("/v4/info", self.handle_info)
+        app.router.add_get("/v4/stats", self.handle_stats)
+        app.router.add_get("/v4/websocket", self.handle_websocket)
+        app.router.add_get("/v4/loadtracks", self.handle_loadtracks)
+        app.router.add_patch("/v4/sessions/{session_id}", self.handle_update_session)
+        app.router.add_get("/v4/sessions/{session_id}/players", self.handle_players)
+        app.router.add_patch("/v4/sessions/{session_id}/players/{guild_id}", self.handle_update_player)
+        app.router.add_delete("/v4/sessions/{session_id}/players/{guild_id}", self.handle_destroy_player)
+
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        # Порт 0 - свободный порт, выбранный системой
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        if self.socket is not None:
+            await self.socket.close()
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    def make_track(self, query: str) -> dict:
+        """Детерминированный трек для поискового запроса."""
+        identifier = hashlib.sha1(query.encode("utf-8")).hexdigest()[:11]
+        encoded = base64.b64encode(f"bench:{identifier}".encode()).decode()
+        title = query.split(":", 1)[-1] or identifier
+        # Поиск по ISRC в кавычках находит трек с этим ISRC
+        isrc = re.fullmatch(r'"([A-Z0-9]{12})"', title)
+        track = {
+            "encoded": encoded,
+            "info": {
+                "identifier": identifier,
+                "isSeekable": True,
+                "author": "Bench Artist",
+                "length": self.track_length,
+                "isStream": False,
+                "position": 0,
+                "title": title,
+                "uri": f"https://www.youtube.com/watch?v={identifier}",
+                "artworkUrl": None,
+                "isrc": isrc.group(1) if isrc else None,
+                "sourceName": "youtube"
+            },
+            "pluginInfo": {},
+            "userData": {}
+        }
+        self.tracks[encoded] = track
+        return track
+
+    def expect_play(self, guild_id: int) -> asyncio.Future:
+        """Future, которое завершится временем следующего запуска трека в гильдии."""
+        future = asyncio.get_running_loop().create_future()
+        self.waiters.setdefault(guild_id, []).append(future)
+        return future
+
+    async def send(self, payload: dict):
+        if self.socket is None or self.socket.closed:
+            return
+        self.counters["events"] += 1
+        await self.socket.send_str(json.dumps(payload))
+
+    async def send_track_event(self, guild_id: int, event_type: str, encoded: str, reason: str = None):
+        payload = {
+            "op": "event",
+            "type": event_type,
+            "guildId": str(guild_id),
+            "track": self.tracks[encoded]
+        }
+        if reason:
+            payload["reason"] = reason
+        await self.send(payload)
+
+    async def finish_all(self, reason: str = "finished") -> list:
+        """Завершает текущий трек во всех гильдиях сразу. Возвращает список гильдий."""
+        finished = [guild_id for guild_id, encoded in self.players.items() if encoded]
+        for guild_id in finished:
+            encoded = self.players[guild_id]
+            self.players[guild_id] = None
+            await self.send_track_event(guild_id, "TrackEndEvent", encoded, reason)
+        return finished
+
+    def player_response(self, guild_id: int) -> dict:
+        encoded = self.players.get(guild_id)
+        return {
+            "guildId": str(guild_id),
+            "track": self.tracks[encoded] if encoded else None,
+            "volume": 100,
+            "paused": False,
+            "state": {"time": int(time.time() * 1000), "position": 0, "connected": True, "ping": 0},
+            "voice": {"token": "", "endpoint": "", "sessionId": ""},
+            "filters": {}
+        }
+
+    async def handle_version(self, request: web.Request):
+        return web.Response(text="4.0.0-bench")
+
+    async def handle_info(self, request: web.Request):
+        return web.json_response({
+            "version": {"semver": "4.0.0", "major": 4, "minor": 0, "patch": 0, "preRelease": None, "build": None},
+            "buildTime": 0,
+            "git": {"branch": "bench", "commit": "0", "commitTime": 0},
+            "jvm": "none",
+            "lavaplayer": "none",
+            "sourceManagers": ["youtube"],
+            "filters": [],
+            "plugins": []
+        })
+
+    async def handle_stats(self, request: web.Request):
+        return web.json_response({
+            "players": len(self.players),
+            "playingPlayers": sum(1 for encoded in self.players.values() if encoded),
+            "uptime": 0,
+            "memory": {"free": 0, "used": 0, "allocated": 0, "reservable": 0},
+            "cpu": {"cores": 1, "systemLoad": 0.0, "lavalinkLoad": 0.0},
+            "frameStats": {"sent": 3000, "nulled": 0, "deficit": 0}
+        })
+
+    async def handle_websocket(self, request: web.Request):
+        if request.headers.get("Authorization") != self.password:
+            raise web.HTTPUnauthorized()
+        socket = web.WebSocketResponse()
+        await socket.prepare(request)
+        self.socket = socket
+        await socket.send_str(json.dumps({"op": "ready", "resumed": False, "sessionId": self.session_id}))
+        self.ready.set()
+        async for _ in socket:
+            pass
+        return socket
+
+    async def handle_loadtracks(self, request: web.Request):
+        self.counters["searches"] += 1
+        if self.search_latency:
+            await asyncio.sleep(self.search_latency)
+        track = self.make_track(request.query.get("identifier", ""))
+        return web.json_response({"loadType": "search", "data": [track]})
+
+    async def handle_update_session(self, request: web.Request):
+        data = await request.json()
+        return web.json_response({"resuming": data.get("resuming", False), "timeout": data.get("timeout", 60)})
+
+    async def handle_players(self, request: web.Request):
+        return web.json_response([self.player_response(guild_id) for guild_id in self.players])
+
+    async def handle_update_player(self, request: web.Request):
+        guild_id = int(request.match_info["guild_id"])
+        no_replace = request.query.get("noReplace") == "True"
+        data = await request.json()
+        current = self.players.get(guild_id)
+
+        if "track" in data:
+            encoded = data["track"].get("encoded")
+            if encoded is None:
+                self.counters["stops"] += 1
+                self.players[guild_id] = None
+                if current:
+                    await self.send_track_event(guild_id, "TrackEndEvent", current, "stopped")
+            elif not (no_replace and current):
+                self.counters["plays"] += 1
+                self.players[guild_id] = encoded
+                if current:
+                    await self.send_track_event(guild_id, "TrackEndEvent", current, "replaced")
+                await self.send_track_event(guild_id, "TrackStartEvent", encoded)
+                now = time.perf_counter()
+                for future in self.waiters.pop(guild_id, []):
+                    if not future.done():
+                        future.set_result(now)
+        else:
+            self.players.setdefault(guild_id, None)
+
+        return web.json_response(self.player_response(guild_id))
+
+    async def handle_destroy_player(self, request: web.Request):
+        self.players.pop(int(request.match_info["guild_id"]), None)
+        return web.Response(status=204)
@@ -0,0 +1,118 @@
+import asyncio
+import hashlib
+from typing import Optional
+
+from aiohttp import web
+
+
+class FakeSpotify:
+    """Заглушка Spotify Web API (и выдачи токена) для SpotifyClient.
+
+    Содержимое определяется идентификатором: `album-<n>-<seed>` - альбом из
+    n треков, `playlist-<n>-<seed>` - плейлист из n треков. Задержка latency
+    имитирует сетевой запрос.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.calls = 0
+        self.token_requests = 0
+        self._runner: Optional[web.AppRunner] = None
+
+    @property
+    def api_url(self) -> str:
+        return f"http://{self.host}:{self.port}/v1"
+
+    @property
+    def token_url(self) -> str:
+        return f"http://{self.host}:{self.port}/api/token"
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post("/api/token", self.handle_token)
+        app.router.add_get("/v1/playlists/{object_id}/tracks", self.handle_playlist_tracks)
+        app.router.add_get("/v1/albums/{object_id}/tracks", self.handle_album_tracks)
+        app.router.add_get("/v1/albums/{object_id}", self.handle_album)
+        app.router.add_get("/v1/tracks", self.handle_tracks)
+        app.router.add_get("/v1/search", self.handle_search)
+
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    async def _request(self):
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    @staticmethod
+    def _size(object_id: str) -> int:
+        return int(object_id.split("-")[1])
+
+    @staticmethod
+    def _track(object_id: str, index: int, album_name: str = None) -> dict:
+        track_id = f"{object_id}-t{index}"
+        return {
+            "id": track_id,
+            "name": f"Track {index} of {object_id}",
+            "artists": [{"name": "Bench Artist"}],
+            "album": {"name": album_name or f"Album of {object_id}", "images": [{"url": "https://example.com/cover.jpg"}]},
+            "external_urls": {"spotify": f"https://open.spotify.com/track/{track_id}"},
+            "external_ids": {"isrc": "BN" + hashlib.sha1(track_id.encode()).hexdigest()[:10].upper()},
+            "duration_ms": 180_000
+        }
+
+    def _page(self, request: web.Request, kind: str, max_limit: int) -> dict:
+        object_id = request.match_info["object_id"]
+        offset = int(request.query.get("offset", 0))
+        limit = min(int(request.query.get("limit", max_limit)), max_limit)
+        total = self._size(object_id)
+        end = min(total, offset + limit)
+        items = [self._track(object_id, index) for index in range(offset, end)]
+        if kind == "playlist":
+            items = [{"track": item} for item in items]
+        else:
+            # Как в Spotify: у треков альбома нет external_ids и album
+            for item in items:
+                del item["external_ids"], item["album"]
+        next_url = None
+        if end < total:
+            next_url = str(request.url.with_query({"offset": end, "limit": limit}))
+        return {"items": items, "total": total, "offset": offset, "limit": limit, "next": next_url}
+
+    async def handle_token(self, request: web.Request):
+        self.token_requests += 1
+        return web.json_response({"access_token": "bench-token", "token_type": "Bearer", "expires_in": 3600})
+
+    async def handle_playlist_tracks(self, request: web.Request):
+        await self._request()
+        return web.json_response(self._page(request, "playlist", 100))
+
+    async def handle_album_tracks(self, request: web.Request):
+        await self._request()
+        return web.json_response(self._page(request, "album", 50))
+
+    async def handle_album(self, request: web.Request):
+        await self._request()
+        object_id = request.match_info["object_id"]
+        return web.json_response({"name": f"Album of {object_id}", "images": [{"url": "https://example.com/cover.jpg"}]})
+
+    async def handle_tracks(self, request: web.Request):
+        await self._request()
+        tracks = []
+        for track_id in request.query["ids"].split(",")[:50]:
+            object_id, index = track_id.rsplit("-t", 1)
+            tracks.append(self._track(object_id, int(index)))
+        return web.json_response({"tracks": tracks})
+
+    async def handle_search(self, request: web.Request):
+        await self._request()
+        return web.json_response({"tracks": {"items": [self._track("search-1-0", 0, album_name=request.query["q"])]}})
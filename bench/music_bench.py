@@ -0,0 +1,366 @@
+"""Офлайн-бенчмарк музыкального кога.
+
+Поднимает заглушку Lavalink (REST + websocket) и подменяет Spotify, после
+чего гоняет /play (треки, альбомы, плейлисты), шторм /skip и волну
+окончаний треков по множеству гильдий. Discord не нужен: взаимодействия
+и голосовые каналы имитируются.
+
+Запуск из корня репозитория:
+    python -m bench.music_bench --guilds 50 --album-size 20 --playlist-size 200
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+import wavelink
+
+from bench.fake_lavalink import FakeLavalink
+from bench.fake_spotify import FakeSpotify
+from core.config import ConfigService
+from core.http import HTTPService
+from core.stats import percentile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class FakeMessage:
+    async def edit(self, **kwargs):
+        pass
+
+
+class FakeResponse:
+    def __init__(self, interaction: "FakeInteraction"):
+        self.interaction = interaction
+        self._done = False
+
+    def is_done(self) -> bool:
+        return self._done
+
+    async def defer(self, **kwargs):
+        self._done = True
+
+    async def send_message(self, *args, **kwargs):
+        self._done = True
+        self.interaction.mark_replied()
+
+
+class FakeFollowup:
+    def __init__(self, interaction: "FakeInteraction"):
+        self.interaction = interaction
+
+    async def send(self, *args, **kwargs):
+        self.interaction.mark_replied()
+        return FakeMessage()
+
+
+class FakeInteraction:
+    """Минимальная замена discord.Interaction для вызова команд кога."""
+
+    def __init__(self, guild: "FakeGuild", user: "FakeMember"):
+        self.guild = guild
+        self.guild_id = guild.id
+        self.user = user
+        self.channel = None
+        self.response = FakeResponse(self)
+        self.followup = FakeFollowup(self)
+        self.created = time.perf_counter()
+        self.replied_at = None
+
+    def mark_replied(self):
+        if self.replied_at is None:
+            self.replied_at = time.perf_counter()
+
+
+class FakeVoiceChannel:
+    def __init__(self, bot: "BenchBot", guild: "FakeGuild"):
+        self.bot = bot
+        self.guild = guild
+        self.id = guild.id + 1
+        self.members = []
+
+    async def connect(self, *, cls, **kwargs):
+        # Как discord.VoiceChannel.connect, но без голосового шлюза Discord
+        player = cls(self.bot, self)
+        player._guild = self.guild
+        player._connected = True
+        player.node._players[self.guild.id] = player
+        self.guild.voice_client = player
+        self.bot.voice_clients.append(player)
+        return player
+
+
+class FakeGuild:
+    def __init__(self, bot: "BenchBot", guild_id: int):
+        self.id = guild_id
+        self.voice_client = None
+        self.voice_channel = FakeVoiceChannel(bot, self)
+        self.member = SimpleNamespace(
+            id=guild_id + 2, bot=False, voice=SimpleNamespace(channel=self.voice_channel)
+        )
+        self.voice_channel.members.append(self.member)
+
+
+class BenchBot:
+    """Минимальная замена commands.Bot: цикл событий, пользователь и диспетчер событий."""
+
+    def __init__(self):
+        self.loop = asyncio.get_running_loop()
+        self.user = SimpleNamespace(id=1)
+        self.http_service = HTTPService()
+        self.config = ConfigService()
+        self.voice_clients = []
+        self.cogs = []
+
+    async def wait_until_ready(self):
+        pass
+
+    def get_channel(self, channel_id: int):
+        return None
+
+    def dispatch(self, event: str, *args, **kwargs):
+        for cog in self.cogs:
+            for name, listener in cog.get_listeners():
+                if name == f"on_{event}":
+                    self.loop.create_task(listener(*args, **kwargs))
+
+
+def summarize(samples: list) -> dict:
+    ordered = sorted(samples)
+    return {
+        "count": len(ordered),
+        "p50_ms": round(percentile(ordered, 50) * 1000, 2),
+        "p95_ms": round(percentile(ordered, 95) * 1000, 2),
+        "p99_ms": round(percentile(ordered, 99) * 1000, 2),
+        "max_ms": round(ordered[-1] * 1000, 2) if ordered else 0.0
+    }
+
+
+class MusicBench:
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.results = {}
+        self.guilds = []
+        self.next_guild_id = 1000
+
+    async def setup(self):
+        args = self.args
+        self.server = FakeLavalink(search_latency=args.search_latency)
+        await self.server.start()
+        self.spotify = FakeSpotify(latency=args.spotify_latency)
+        await self.spotify.start()
+
+        # Конфиг и data/ кога - во временном каталоге, чтобы не трогать настоящие
+        self.workdir = tempfile.mkdtemp(prefix="music-bench-")
+        os.chdir(self.workdir)
+        with open("config.json", "w", encoding="utf-8") as f:
+            json.dump({
+                "token": "bench",
+                "spotify_client_id": "bench",
+                "spotify_client_secret": "bench",
+                "lavalink_nodes": [{
+                    "identifier": "bench",
+                    "host": self.server.host,
+                    "port": self.server.port,
+                    "password": self.server.password,
+                    "secure": False
+                }]
+            }, f)
+
+        from cogs.music import MusicCog
+
+        self.bot = BenchBot()
+        self.cog = MusicCog(self.bot)
+        self.bot.cogs.append(self.cog)
+        # Клиент Spotify ходит в заглушку вместо api.spotify.com
+        sp = (await self.cog.spotify.get()).sp
+        sp.api_url = self.spotify.api_url
+        sp.token_url = self.spotify.token_url
+
+        await asyncio.wait_for(self.server.ready.wait(), 10)
+        while not any(node.status is wavelink.NodeStatus.CONNECTED for node in wavelink.Pool.nodes.values()):
+            await asyncio.sleep(0.01)
+
+    async def teardown(self):
+        # Отключение узла при закрытии - не сбой, обработчики кога тут не нужны
+        self.bot.cogs.clear()
+        self.cog.save_track_cache.cancel()
+        self.cog.reap_idle_players.cancel()
+        self.cog.refresh_node_stats.cancel()
+        self.cog.snapshot_players.cancel()
+        await self.bot.http_service.close()
+        await wavelink.Pool.close()
+        await self.server.close()
+        await self.spotify.close()
+        os.chdir(REPO_ROOT)
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def new_guild(self) -> FakeGuild:
+        guild = FakeGuild(self.bot, self.next_guild_id)
+        self.next_guild_id += 10
+        return guild
+
+    async def invoke(self, command, guild: FakeGuild, **kwargs) -> FakeInteraction:
+        interaction = FakeInteraction(guild, guild.member)
+        await command.callback(self.cog, interaction, **kwargs)
+        interaction.finished_at = time.perf_counter()
+        return interaction
+
+    async def play_guild(self, guild: FakeGuild, seed: int) -> dict:
+        """Сценарий одной гильдии: трек, альбом и плейлист подряд."""
+        args = self.args
+        timings = {}
+        for name, query in (
+            ("track", f"bench track {seed}"),
+            ("album", f"https://open.spotify.com/album/album-{args.album_size}-{seed}"),
+            ("playlist", f"https://open.spotify.com/playlist/playlist-{args.playlist_size}-{seed}")
+        ):
+            interaction = await self.invoke(self.cog.play, guild, query=query, playlist_limit=0)
+            # Страницы плейлиста после первой догружаются в фоне - очередь заполнена, когда они загружены
+            background = self.cog.playlist_tasks.get(guild.id)
+            if background:
+                await asyncio.gather(*background)
+                interaction.finished_at = time.perf_counter()
+            timings[name] = (
+                (interaction.replied_at or interaction.finished_at) - interaction.created,
+                interaction.finished_at - interaction.created
+            )
+        return timings
+
+    async def run_play(self):
+        """Параллельный /play во всех гильдиях: время ответа и заполнения очереди."""
+        self.guilds = [self.new_guild() for _ in range(self.args.guilds)]
+        started = time.perf_counter()
+        timings = await asyncio.gather(*(self.play_guild(guild, i) for i, guild in enumerate(self.guilds)))
+        wall = time.perf_counter() - started
+
+        result = {"wall_s": round(wall, 3)}
+        for name in ("track", "album", "playlist"):
+            result[f"{name}_reply"] = summarize([t[name][0] for t in timings])
+            result[f"{name}_queue_fill"] = summarize([t[name][1] for t in timings])
+        expected = self.args.album_size + self.args.playlist_size
+        result["queued_per_guild"] = round(
+            sum(len(self.cog.get_queue(guild.id)) for guild in self.guilds) / len(self.guilds), 1
+        )
+        result["queued_expected"] = expected
+        self.results["play"] = result
+
+    async def run_skip_storm(self):
+        """Одновременные /skip в каждой гильдии: задержка ответа и число реальных остановок."""
+        stops_before = self.server.counters["stops"]
+        samples = []
+
+        async def storm(guild: FakeGuild):
+            interactions = await asyncio.gather(
+                *(self.invoke(self.cog.skip, guild) for _ in range(self.args.skips))
+            )
+            samples.extend(i.finished_at - i.created for i in interactions)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(storm(guild) for guild in self.guilds))
+        wall = time.perf_counter() - started
+        # Даём событиям окончания трека дойти до кога
+        await asyncio.sleep(0.2)
+        self.results["skip_storm"] = {
+            "wall_s": round(wall, 3),
+            "latency": summarize(samples),
+            "commands": len(samples),
+            "player_stops": self.server.counters["stops"] - stops_before
+        }
+
+    async def run_track_end_flood(self):
+        """Все треки заканчиваются одновременно: время до запуска следующего трека."""
+        samples = []
+        for _ in range(self.args.flood_rounds):
+            waiting = {guild.id: self.server.expect_play(guild.id)
+                       for guild in self.guilds if self.cog.get_queue(guild.id)}
+            sent = time.perf_counter()
+            await self.server.finish_all()
+            done, pending = await asyncio.wait(waiting.values(), timeout=10)
+            for future in pending:
+                future.cancel()
+            samples.extend(future.result() - sent for future in done)
+        self.results["track_end_flood"] = {
+            "rounds": self.args.flood_rounds,
+            "next_track": summarize(samples),
+            "timeouts": self.args.flood_rounds * len(self.guilds) - len(samples),
+            "prefetch_hits": self.cog.prefetch_hits,
+            "prefetch_misses": self.cog.prefetch_misses
+        }
+        self.results["matches"] = dict(self.cog.resolver.matches)
+
+    async def run_memory(self):
+        """Память, которую удерживает одна гильдия с альбомом и плейлистом в очереди."""
+        count = max(1, self.args.guilds // 5)
+        gc.collect()
+        tracemalloc.start()
+        baseline = tracemalloc.take_snapshot()
+        guilds = [self.new_guild() for _ in range(count)]
+        await asyncio.gather(*(self.play_guild(guild, 10_000 + i) for i, guild in enumerate(guilds)))
+        await asyncio.sleep(0.2)
+        gc.collect()
+        snapshot = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        retained = sum(stat.size_diff for stat in snapshot.compare_to(baseline, "filename"))
+        self.results["memory"] = {
+            "guilds": count,
+            "per_guild_kib": round(retained / count / 1024, 1),
+            "per_queued_track_b": round(retained / count / (self.args.album_size + self.args.playlist_size))
+        }
+
+    async def run(self):
+        await self.setup()
+        try:
+            await self.run_play()
+            await self.run_skip_storm()
+            await self.run_track_end_flood()
+            await self.run_memory()
+            self.results["server"] = dict(self.server.counters)
+            self.results["spotify_calls"] = self.spotify.calls
+        finally:
+            await self.teardown()
+        return self.results
+
+
+def print_report(results: dict):
+    for section, values in results.items():
+        print(f"\n[{section}]")
+        if not isinstance(values, dict):
+            print(f"  {values}")
+            continue
+        for key, value in values.items():
+            if isinstance(value, dict):
+                value = "  ".join(f"{k}={v}" for k, v in value.items())
+            print(f"  {key:<22} {value}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Офлайн-бенчмарк музыкального кога")
+    parser.add_argument("--guilds", type=int, default=50, help="Число гильдий")
+    parser.add_argument("--album-size", type=int, default=20, help="Треков в альбоме")
+    parser.add_argument("--playlist-size", type=int, default=200, help="Треков в плейлисте")
+    parser.add_argument("--skips", type=int, default=5, help="Одновременных /skip на гильдию")
+    parser.add_argument("--flood-rounds", type=int, default=3, help="Волн окончания треков")
+    parser.add_argument("--search-latency", type=float, default=0.005, help="Задержка поиска Lavalink (сек.)")
+    parser.add_argument("--spotify-latency", type=float, default=0.01, help="Задержка запроса Spotify (сек.)")
+    parser.add_argument("--json", help="Сохранить результаты в JSON-файл")
+    args = parser.parse_args()
+    if args.json:
+        args.json = os.path.abspath(args.json)
+
+    results = asyncio.run(MusicBench(args).run())
+    print_report(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,19 +1,12 @@
 import discord
 from discord.ext import commands
 from discord import app_commands
-import aiohttp
 import json
 import os
-import google.generativeai as genai
+from core.lazy import Lazy
 
-# Load configuration
-with open("config.json") as f:
-    config = json.load(f)
-
-GROQ_API_KEY = config.get("groq_api_key")
 GROQ_API_URL = "https://api.groq.com/openai/v1/chat/completions"
 TEST_GUILD_ID = 1166664409578491934  # Replace with your server ID
-DEBUG_ACCESS_UIDS = config.get("discord_debug_access_uid", [])
 
 # Load models from models.json
 with open("data/models.json") as f:
@@ -47,6 +40,14 @@ def save_blocked_ids(blocked_ids):
         json.dump(blocked_ids, f, ensure_ascii=False, indent=4)
 
 
+def build_gemini_model(api_key: str):
+    """Imports and configures google.generativeai (called on first use of the provider)."""
+    import google.generativeai as genai
+
+    genai.configure(api_key=api_key)
+    return genai.GenerativeModel("gemini-2.0-flash-exp-image-generation")
+
+
 class AI(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
@@ -55,9 +56,21 @@ class AI(commands.Cog):
         self.blocked_ids = load_blocked_ids()
         self.user_preferences = {}  # Store user preferences
 
-        # Initialize Gemini API
-        genai.configure(api_key=config.get("gemini_api_key"))
-        self.gemini_model = genai.GenerativeModel("gemini-2.0-flash-exp-image-generation")
+        # API keys come from the shared bot config and may change at runtime
+        self.config = bot.config
+        self.reset_gemini_model()
+        self.config.subscribe(self.reset_gemini_model, keys=("gemini_api_key",))
+        # Only messages that mention the bot reach on_mention
+        bot.message_router.register(self.on_mention, mention=True)
+
+    def reset_gemini_model(self, config=None):
+        """Gemini API is heavy to import: initialized on first "google" request (again after a key change)."""
+        api_key = self.config.get("gemini_api_key")
+        self.gemini_model = Lazy(lambda: build_gemini_model(api_key), name="Gemini")
+
+    async def cog_unload(self):
+        self.config.unsubscribe(self.reset_gemini_model)
+        self.bot.message_router.unregister_owner(self)
 
     async def fetch_ai_response(self, user_id: int, prompt: str, provider: str = None, model: str = None) -> list[str]:
         """Fetch AI response from the API."""
@@ -86,7 +99,7 @@ class AI(commands.Cog):
         if provider == "groq":
             headers = {
                 "Content-Type": "application/json",
-                "Authorization": f"Bearer {GROQ_API_KEY}"
+                "Authorization": f"Bearer {self.config.get('groq_api_key')}"
             }
             selected_model = model if model else self.selected_model
             payload = {
@@ -96,27 +109,33 @@ class AI(commands.Cog):
             api_url = GROQ_API_URL
 
         elif provider == "google":
-            genai.configure(api_key=config.get("gemini_api_key"))
             selected_model = "gemini-2.0-flash"  # Use this model for text response
 
         else:
             return ["Неверный провайдер API."]
 
         if provider == "groq":
-            async with aiohttp.ClientSession() as session:
-                try:
-                    async with session.post(api_url, headers=headers, json=payload) as resp:
-                        if resp.status != 200:
-                            return [f"Ошибка API: {resp.status} - {await resp.text()}"]
-                        result = await resp.json()
-                except Exception as e:
-                    return [f"Ошибка при запросе к API: {e}"]
+            try:
+                response = await self.bot.http_service.request(
+                    "POST", api_url, headers=headers, json=payload, raise_for_status=False
+                )
+            except Exception as e:
+                return [f"Ошибка при запросе к API: {e}"]
+            if response.status != 200:
+                return [f"Ошибка API: {response.status} - {response.data}"]
+            result = response.data
 
             ai_response = result.get("choices", [{}])[0].get("message", {}).get("content", "Ошибка обработки ответа.")
 
         elif provider == "google":
             try:
-                response = self.gemini_model.generate_content(contents=full_prompt)
+                gemini_model = await self.gemini_model.get()
+            except ImportError:
+                return ["Google API недоступен: установите google-generativeai."]
+            except Exception as e:
+                return [f"Ошибка при запросе к Google API: {e}"]
+            try:
+                response = gemini_model.generate_content(contents=full_prompt)
                 ai_response = ""
                 for part in response.candidates[0].content.parts:
                     if part.text is not None:
@@ -157,21 +176,16 @@ class AI(commands.Cog):
         for response in responses:
             await interaction.followup.send(response)
 
-    @commands.Cog.listener()
-    async def on_message(self, message: discord.Message):
-        """Event to handle bot mentions."""
+    async def on_mention(self, message: discord.Message):
+        """Handles bot mentions (routed by bot.message_router, own messages excluded)."""
 
-        if message.author == self.bot.user:
-            return
-
-        if self.bot.user.mentioned_in(message):
-            user_id = message.author.id
-            prompt = message.content.replace(f"<@{self.bot.user.id}>", "").strip()  # Remove mention from text
+        user_id = message.author.id
+        prompt = message.content.replace(f"<@{self.bot.user.id}>", "").strip()  # Remove mention from text
 
-            await message.channel.typing()  # Show that the bot is "thinking"
-            responses = await self.fetch_ai_response(user_id, prompt)
-            for response in responses:
-                await message.reply(response)
+        await message.channel.typing()  # Show that the bot is "thinking"
+        responses = await self.fetch_ai_response(user_id, prompt)
+        for response in responses:
+            await message.reply(response)
 
     @ask_command.autocomplete("provider")
     async def provider_autocomplete(self, interaction: discord.Interaction, current: str):
@@ -199,7 +213,7 @@ class AI(commands.Cog):
     async def block_user_command(self, interaction: discord.Interaction, user: discord.User):
         """Slash command to block a user from using AI commands."""
 
-        if str(interaction.user.id) not in DEBUG_ACCESS_UIDS:
+        if str(interaction.user.id) not in self.config.get("discord_debug_access_uid", []):
             await interaction.response.send_message("Эта команда доступна только пользователям с доступом.", ephemeral=True)
             return
 
@@ -215,7 +229,7 @@ class AI(commands.Cog):
     async def unblock_user_command(self, interaction: discord.Interaction, user: discord.User):
         """Slash command to unblock a user for using AI commands."""
 
-        if str(interaction.user.id) not in DEBUG_ACCESS_UIDS:
+        if str(interaction.user.id) not in self.config.get("discord_debug_access_uid", []):
             await interaction.response.send_message("Эта команда доступна только пользователям с доступом.", ephemeral=True)
             return
 
@@ -2,14 +2,12 @@ import discord
 from discord.ext import commands
 from discord import app_commands
 import logging
-import json
 import re
 
 class Anonymous(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        with open("config.json", "r") as f:
-            self.config = json.load(f)
+        self.config = bot.config
         self.setup_logger()
         self.url_pattern = re.compile(
             r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\(\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+|'
@@ -74,6 +74,8 @@ class CategorySelect(discord.ui.Select):
                 "• `/stop` - Остановить воспроизведение\n"
                 "• `/queue` - Показать очередь треков\n"
                 "• `/nowplaying` - Показать текущий трек\n"
+                "• `/back` - Вернуться к предыдущему треку\n"
+                "• `/history` - Недавно сыгранные треки\n"
                 "• `/save` - Сохранить трек в ЛС\n"
                 "• `/loop` - Управление повтором\n"
                 "• `/shuffle` - Перемешать очередь\n"
@@ -8,20 +8,12 @@ from datetime import datetime
 import pytz
 
 IDEAS_FILE = "data/ideas.json"
-CONFIG_FILE = "config.json"
 
 class Ideas(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
         self.ideas: Dict[str, Any] = self.load_ideas()
-        self.config = self.load_config()
-        
-    def load_config(self) -> dict:
-        try:
-            with open(CONFIG_FILE, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            return {}
+        self.config = bot.config  # общий ConfigService: значения всегда актуальны
 
     def load_ideas(self) -> dict:
         os.makedirs("data", exist_ok=True)
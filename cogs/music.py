@@ -1,16 +1,49 @@
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 from discord import app_commands
 import wavelink
 import asyncio
-import json
 import time
-import spotipy
-from spotipy.oauth2 import SpotifyClientCredentials
-
-# Загрузка конфигурации
-with open("config.json", "r", encoding="utf-8") as f:
-    config = json.load(f)
+from collections import OrderedDict, deque
+from core.lazy import Lazy
+from core.stats import RollingStats
+from music.actor import GuildActor
+from music.autocomplete import SearchSuggester
+from music.cache import TrackCache
+from music.lyrics import GeniusProvider, LrcLibProvider, LyricsService
+from music.nodes import NodeBalancer, build_nodes
+from music.queue import GuildQueue, QueueEntry
+from music.resolver import PendingTrack, TrackResolver
+from music.state import PlayerStateStore, deserialize_entry, serialize_entry
+
+# Минимальный интервал между обновлениями embed с прогрессом загрузки (сек.)
+PROGRESS_EDIT_INTERVAL = 1.5
+# Значения по умолчанию для настроек, которые можно менять в config.json на лету:
+# Сколько следующих треков очереди готовить заранее (поиск и метаданные) - music_lookahead
+LOOKAHEAD_TRACKS = 3
+# Как часто сохранять снимки состояния плееров (сек.) - music_snapshot_interval
+SNAPSHOT_INTERVAL = 15
+# Через сколько секунд простоя (тишина или пустой канал) отключать плеер - music_idle_timeout
+IDLE_TIMEOUT = 300
+# Сколько сыгранных треков помнить для /back и /history - music_history_size
+HISTORY_SIZE = 50
+# Не чаще скольких секунд обновлять текущую строку синхронизированного текста - lyrics_edit_interval
+LYRICS_EDIT_INTERVAL = 3
+
+# Сколько треков показывать на одной странице /queue
+QUEUE_PAGE_SIZE = 10
+# Сколько строк текста показывать до и после текущей
+LYRICS_CONTEXT_BEFORE = 3
+LYRICS_CONTEXT_AFTER = 5
+# Сколько треков из подсказок /play помнить и сколько секунд (как кэш подсказок)
+SUGGESTED_TRACKS_SIZE = 500
+SUGGESTED_TRACKS_TTL = 600
+
+# Ключи config.json, при изменении которых вызывается MusicCog.apply_config
+CONFIG_KEYS = (
+    "music_lookahead", "music_idle_timeout", "music_history_size", "lyrics_edit_interval",
+    "music_snapshot_interval", "genius_token", "spotify_client_id", "spotify_client_secret"
+)
 
 def format_time(seconds: float) -> str:
     """Форматирует время в виде mm:ss."""
@@ -18,134 +51,795 @@ def format_time(seconds: float) -> str:
     secs = int(seconds % 60)
     return f"{minutes}:{secs:02d}"
 
+def format_duration(milliseconds: int) -> str:
+    """Форматирует длительность в виде h:mm:ss (или mm:ss, если меньше часа)."""
+    seconds = int(milliseconds // 1000)
+    hours, seconds = divmod(seconds, 3600)
+    if hours:
+        return f"{hours}:{seconds // 60:02d}:{seconds % 60:02d}"
+    return format_time(seconds)
+
+class QueueView(discord.ui.View):
+    """Постраничный просмотр очереди.
+
+    Каждая страница строится только из видимых элементов, поэтому
+    листать очередь на тысячи треков так же дёшево, как короткую.
+    """
+
+    def __init__(self, cog: "MusicCog", guild_id: int):
+        super().__init__(timeout=120)
+        self.cog = cog
+        self.guild_id = guild_id
+        self.page = 0
+
+    def page_count(self) -> int:
+        queue = self.cog.get_queue(self.guild_id)
+        return max(1, -(-len(queue) // QUEUE_PAGE_SIZE))
+
+    def build_embed(self) -> discord.Embed:
+        queue = self.cog.get_queue(self.guild_id)
+        pages = self.page_count()
+        self.page = min(self.page, pages - 1)
+        start = self.page * QUEUE_PAGE_SIZE
+
+        # До начала очереди осталось доиграть текущий трек
+        remaining = 0
+        guild = self.cog.bot.get_guild(self.guild_id)
+        player = guild.voice_client if guild else None
+        if isinstance(player, wavelink.Player) and player.current:
+            remaining = max(0, player.current.length - player.position)
+
+        lines = []
+        for index, entry in enumerate(queue.page(start, QUEUE_PAGE_SIZE), start=start):
+            starts_in = remaining + queue.start_time(index)
+            lines.append(
+                f"{index + 1}. {entry.title} `{format_duration(entry.length)}` "
+                f"(через {format_duration(starts_in)})"
+            )
+
+        embed = discord.Embed(
+            title="Очередь воспроизведения",
+            description="\n".join(lines) or "Очередь пуста!",
+            color=discord.Color.blue()
+        )
+        embed.add_field(name="Треков", value=str(len(queue)), inline=True)
+        embed.add_field(name="Общая длительность", value=format_duration(queue.total_duration), inline=True)
+        embed.set_footer(text=f"Страница {self.page + 1}/{pages} • Made with ❤️ by npcx42")
+
+        self.first_page.disabled = self.previous_page.disabled = self.page == 0
+        self.next_page.disabled = self.last_page.disabled = self.page >= pages - 1
+        return embed
+
+    async def show(self, interaction: discord.Interaction, page: int):
+        self.page = max(0, page)
+        await interaction.response.edit_message(embed=self.build_embed(), view=self)
+
+    @discord.ui.button(emoji="⏮️", style=discord.ButtonStyle.secondary)
+    async def first_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.show(interaction, 0)
+
+    @discord.ui.button(emoji="◀️", style=discord.ButtonStyle.primary)
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.show(interaction, self.page - 1)
+
+    @discord.ui.button(emoji="▶️", style=discord.ButtonStyle.primary)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.show(interaction, self.page + 1)
+
+    @discord.ui.button(emoji="⏭️", style=discord.ButtonStyle.secondary)
+    async def last_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.show(interaction, self.page_count() - 1)
+
 class MusicCog(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        self.queues = {}
+        self.config = bot.config
+        self.queues = {}  # guild_id -> GuildQueue
+        # Все изменения очереди и плеера гильдии проходят через её актор по очереди
+        self.actors = {}  # guild_id -> GuildActor
+        self.balancer = NodeBalancer()
         bot.loop.create_task(self.connect_to_nodes())
         self.loop_mode = {}  # none, track, queue
         self.volume_levels = {}
-        self.previous_tracks = {}  # История треков для команды back
-        # Initialize Spotify client
-        self.sp = spotipy.Spotify(auth_manager=SpotifyClientCredentials(
-            client_id=config["spotify_client_id"],
-            client_secret=config["spotify_client_secret"]
-        ))
+        self.previous_tracks = {}  # guild_id -> deque(QueueEntry), история для /back
+        # Кэш найденных треков, общий для всех гильдий и переживающий перезапуск
+        self.track_cache = TrackCache(
+            capacity=self.config.get("track_cache_size", 5000),
+            ttl=self.config.get("track_cache_ttl", 7 * 24 * 3600)
+        )
+        # Параллельный поиск треков альбомов и плейлистов
+        self.resolver = TrackResolver(self.config.get("music_search_concurrency", 8), cache=self.track_cache)
+        # Подсказки для /play: дебаунс по пользователю и кэш по префиксу
+        self.suggester = SearchSuggester(
+            self.autocomplete_search,
+            debounce=self.config.get("music_autocomplete_debounce", 0.35)
+        )
+        # Треки из подсказок, пока пользователь выбирает; в track_cache попадает только выбранный
+        self.suggested_tracks = OrderedDict()  # uri -> (expires_at, track)
+        self.lookahead_tasks = {}  # guild_id -> задача подготовки ближайших треков
+        self.playlist_tasks = {}  # guild_id -> {задачи догрузки плейлистов}
+        # Паузы между треками: от конца одного до старта следующего
+        self.track_end_times = {}  # guild_id -> perf_counter() окончания трека
+        self.gap_stats = RollingStats()
+        self.prefetch_hits = 0
+        self.prefetch_misses = 0
+        # Отключение простаивающих плееров
+        self.last_activity = {}  # guild_id -> time.monotonic() последней активности
+        self.listener_counts = {}  # guild_id -> слушателей в канале при последней проверке
+        self.reaped_players = 0
+        # Клиент Spotify и кэш метаданных создаются при первом обращении
+        self.spotify = Lazy(self.build_spotify, name="Spotify")
+        self.spotify_credentials = (self.config.get("spotify_client_id"), self.config.get("spotify_client_secret"))
+        self.now_playing = {}  # guild_id -> (encoded текущего трека, метаданные Spotify)
+        # Тексты песен: сначала синхронизированные (LRCLIB), затем Genius
+        self.lyrics_service = LyricsService(bot.http_service, self.lyrics_providers())
+        self.lyrics_tasks = {}  # guild_id -> задача, ведущая текущую строку текста
+        # Снимки состояния плееров для восстановления после перезапуска
+        self.state_store = PlayerStateStore()
+        self.snapshot_signatures = {}  # guild_id -> сигнатура последнего сохранённого снимка
+        self.saved_positions = {}
+        # Настройки, которые меняются без перезапуска
+        self.apply_config(self.config)
+        self.config.subscribe(self.apply_config, keys=CONFIG_KEYS)
+        self.players_restored = False  # восстановление - один раз, при первом готовом узле
+        self.save_track_cache.start()
+        self.reap_idle_players.start()
+        # Снимки пишутся независимо от узлов: до восстановления плееров их нет, и старые не трогаются
+        self.snapshot_players.start()
+
+    def lyrics_providers(self) -> list:
+        providers = [LrcLibProvider()]
+        if self.config.get("genius_token"):
+            providers.append(GeniusProvider(self.config["genius_token"]))
+        return providers
+
+    def apply_config(self, config):
+        """Применяет настройки из config.json (при загрузке и после его изменения)."""
+        self.lookahead_tracks = config.get("music_lookahead", LOOKAHEAD_TRACKS)
+        self.idle_timeout = config.get("music_idle_timeout", IDLE_TIMEOUT)
+        # Новый размер получат истории гильдий, созданные после изменения
+        self.history_size = config.get("music_history_size", HISTORY_SIZE)
+        self.lyrics_edit_interval = config.get("lyrics_edit_interval", LYRICS_EDIT_INTERVAL)
+        snapshot_interval = config.get("music_snapshot_interval", SNAPSHOT_INTERVAL)
+        if self.snapshot_players.seconds != snapshot_interval:
+            self.snapshot_players.change_interval(seconds=snapshot_interval)
+        self.lyrics_service.providers = self.lyrics_providers()
+        credentials = (config.get("spotify_client_id"), config.get("spotify_client_secret"))
+        if credentials != self.spotify_credentials:
+            # Клиент с новыми ключами создастся при следующем обращении
+            self.spotify = Lazy(self.build_spotify, name="Spotify")
+        self.spotify_credentials = credentials
+
+    async def cog_unload(self):
+        self.config.unsubscribe(self.apply_config)
+        self.save_track_cache.cancel()
+        self.reap_idle_players.cancel()
+        self.refresh_node_stats.cancel()
+        if self.snapshot_players.is_running():
+            self.snapshot_players.cancel()
+            await self.snapshot_players()
+        await self.track_cache.save()
+        for task in self.lyrics_tasks.values():
+            task.cancel()
+        for guild_tasks in self.playlist_tasks.values():
+            for task in guild_tasks:
+                task.cancel()
+
+    @tasks.loop(minutes=5)
+    async def save_track_cache(self):
+        """Периодически сбрасывает кэш треков на диск."""
+        await self.track_cache.save()
+
+    def release_guild(self, guild_id: int):
+        """Освобождает всё музыкальное состояние гильдии."""
+        self.queues.pop(guild_id, None)
+        self.loop_mode.pop(guild_id, None)
+        self.volume_levels.pop(guild_id, None)
+        self.previous_tracks.pop(guild_id, None)
+        self.now_playing.pop(guild_id, None)
+        self.track_end_times.pop(guild_id, None)
+        self.last_activity.pop(guild_id, None)
+        self.listener_counts.pop(guild_id, None)
+        task = self.lookahead_tasks.pop(guild_id, None)
+        if task and not task.done():
+            task.cancel()
+        for task in self.playlist_tasks.pop(guild_id, ()):
+            task.cancel()
+        task = self.lyrics_tasks.pop(guild_id, None)
+        if task and not task.done():
+            task.cancel()
+        actor = self.actors.pop(guild_id, None)
+        if actor:
+            actor.cancel()
+
+    @tasks.loop(seconds=30)
+    async def reap_idle_players(self):
+        """Отключает плееры, которые дольше idle_timeout ничего не играют или никого не слушают."""
+        now = time.monotonic()
+        reaped = 0
+        for player in list(self.bot.voice_clients):
+            if not isinstance(player, wavelink.Player) or not player.guild:
+                continue
+            guild_id = player.guild.id
+            listeners = sum(1 for member in player.channel.members if not member.bot) if player.channel else 0
+            self.listener_counts[guild_id] = listeners
+
+            if player.playing and not player.paused and listeners:
+                self.last_activity[guild_id] = now
+                continue
+
+            idle_since = self.last_activity.setdefault(guild_id, now)
+            if now - idle_since < self.idle_timeout:
+                continue
+
+            try:
+                await self.get_actor(guild_id).run(player.disconnect)
+            except Exception as e:
+                print(f"Error disconnecting idle player {guild_id}: {e}")
+            self.release_guild(guild_id)
+            reaped += 1
+
+        if reaped:
+            self.reaped_players += reaped
+            print(f"Отключено простаивающих плееров: {reaped} (всего: {self.reaped_players})")
+
+    @reap_idle_players.before_loop
+    async def before_reap_idle_players(self):
+        await self.bot.wait_until_ready()
+
+    @tasks.loop(seconds=30)
+    async def refresh_node_stats(self):
+        """Периодически обновляет нагрузку узлов Lavalink."""
+        await self.balancer.refresh()
 
     async def connect_to_nodes(self):
-        """Connect to the Lavalink nodes."""
+        """Connect to the Lavalink nodes.
+
+        Pool.connect подключает узлы по очереди, поэтому каждый узел
+        подключается отдельно: недоступный узел не задерживает остальные.
+        Статистика узлов и восстановление плееров запускаются по первому
+        on_wavelink_node_ready.
+        """
         await self.bot.wait_until_ready()
         try:
-            nodes = [
-                wavelink.Node(
-                    uri=f'http{"s" if config.get("lavalink_secure") else ""}://{config.get("lavalink_host")}:{config.get("lavalink_port")}',
-                    password=config.get("lavalink_password")
-                )
-            ]
-            await wavelink.Pool.connect(nodes=nodes, client=self.bot)
-            print("Successfully connected to Lavalink!")
+            nodes = build_nodes(self.config)
         except Exception as e:
             print(f"Failed to connect to Lavalink: {e}")
+            return
+
+        await asyncio.gather(*(self.connect_node(node) for node in nodes))
+        print(f"Подключено узлов Lavalink: {len(self.balancer.connected_nodes())}/{len(nodes)}")
+
+    async def connect_node(self, node: wavelink.Node):
+        try:
+            await wavelink.Pool.connect(nodes=[node], client=self.bot)
+        except Exception as e:
+            print(f"Failed to connect to Lavalink node {node.identifier}: {e}")
+
+    def build_snapshot(self, player: wavelink.Player) -> dict:
+        """Снимок состояния плеера гильдии: канал, текущий трек, очередь, настройки."""
+        guild_id = player.guild.id
+        current = None
+        if player.current:
+            current = {"t": player.current.raw_data}
+            cached = self.now_playing.get(guild_id)
+            if cached and cached[0] == player.current.encoded:
+                current["i"] = cached[1]
+
+        return {
+            "channel_id": player.channel.id,
+            "current": current,
+            "position": player.position,
+            "paused": player.paused,
+            "volume": player.volume,
+            "loop_mode": self.loop_mode.get(guild_id, "none"),
+            "queue": [serialize_entry(entry) for entry in self.get_queue(guild_id)]
+        }
+
+    @tasks.loop(seconds=SNAPSHOT_INTERVAL)
+    async def snapshot_players(self):
+        """Сохраняет изменившиеся снимки плееров и текущие позиции."""
+        positions = {}
+        active = set()
+        for player in list(self.bot.voice_clients):
+            if not isinstance(player, wavelink.Player) or not player.guild or not player.channel:
+                continue
+            guild_id = player.guild.id
+            active.add(guild_id)
+
+            # Полный снимок пишем, только если что-то кроме позиции изменилось
+            signature = (
+                self.get_queue(guild_id).version,
+                player.current.encoded if player.current else None,
+                self.loop_mode.get(guild_id, "none"),
+                player.paused,
+                player.volume,
+                player.channel.id
+            )
+            try:
+                if self.snapshot_signatures.get(guild_id) != signature:
+                    await self.state_store.save_guild(guild_id, self.build_snapshot(player))
+                    self.snapshot_signatures[guild_id] = signature
+            except Exception as e:
+                print(f"Error saving player snapshot for {guild_id}: {e}")
+            if player.current:
+                positions[guild_id] = player.position
+
+        for guild_id in set(self.snapshot_signatures) - active:
+            await self.state_store.delete(guild_id)
+            del self.snapshot_signatures[guild_id]
+
+        if positions != self.saved_positions:
+            try:
+                await self.state_store.save_positions(positions)
+                self.saved_positions = positions
+            except Exception as e:
+                print(f"Error saving player positions: {e}")
+
+    async def restore_players(self):
+        """Восстанавливает плееры из снимков после перезапуска бота."""
+        snapshots = await asyncio.to_thread(self.state_store.load_all)
+        restored = 0
+        for guild_id, snapshot in snapshots.items():
+            try:
+                if await self.restore_player(guild_id, snapshot):
+                    restored += 1
+                else:
+                    await self.state_store.delete(guild_id)
+            except Exception as e:
+                print(f"Error restoring player for {guild_id}: {e}")
+        if snapshots:
+            print(f"Восстановлено плееров: {restored}/{len(snapshots)}")
+
+    async def restore_player(self, guild_id: int, snapshot: dict) -> bool:
+        guild = self.bot.get_guild(guild_id)
+        channel = guild.get_channel(snapshot["channel_id"]) if guild else None
+        # Нет смысла возвращаться в канал, где никого не осталось
+        if not channel or not any(not member.bot for member in channel.members):
+            return False
+        if guild.voice_client:
+            return True
+
+        player = await self.connect_player(channel)
+
+        async def restore():
+            queue = self.get_queue(guild_id)
+            queue.clear()
+            for data in snapshot.get("queue", []):
+                queue.append(deserialize_entry(data))
+            self.loop_mode[guild_id] = snapshot.get("loop_mode", "none")
+
+            if snapshot.get("current"):
+                entry = deserialize_entry(snapshot["current"])
+                start = int(snapshot.get("position", 0))
+            else:
+                entry = await self.next_playable(queue)
+                start = 0
+
+            if entry:
+                await player.play(
+                    entry.track,
+                    start=start,
+                    volume=snapshot.get("volume", 100),
+                    paused=snapshot.get("paused", False)
+                )
+                self.remember_track_info(guild_id, entry.track, entry.info)
+
+        await self.get_actor(guild_id).run(restore)
+        self.schedule_lookahead(guild_id)
+        return True
+
+    async def connect_player(self, channel: discord.VoiceChannel) -> wavelink.Player:
+        """Подключается к голосовому каналу через наименее нагруженный узел."""
+        node = self.balancer.best_node()
+        return await channel.connect(cls=wavelink.Player(nodes=[node]) if node else wavelink.Player)
+
+    async def failover_players(self, node: wavelink.Node):
+        """Переносит плееры с упавшего узла на здоровые, сохраняя трек и позицию.
+
+        Очередь хранится в коге, поэтому переносить её отдельно не нужно.
+        Перенос идёт через актор гильдии, чтобы не пересечься с переходом
+        к следующему треку.
+        """
+        players = [vc for vc in self.bot.voice_clients
+                   if isinstance(vc, wavelink.Player) and vc.node.identifier == node.identifier]
+        for player in players:
+            target = self.balancer.best_node(exclude=node)
+            if target is None:
+                print(f"Узел {node.identifier} недоступен, а других узлов нет")
+                return
+            try:
+                await self.get_actor(player.guild.id).run(lambda: player.switch_node(target))
+                print(f"Плеер {player.guild.id} перенесён с {node.identifier} на {target.identifier}")
+            except Exception as e:
+                print(f"Не удалось перенести плеер {player.guild.id} на {target.identifier}: {e}")
+
+    def get_actor(self, guild_id: int) -> GuildActor:
+        """Актор гильдии, через который последовательно идут операции с плеером."""
+        if guild_id not in self.actors:
+            self.actors[guild_id] = GuildActor(guild_id)
+        return self.actors[guild_id]
+
+    async def play_or_enqueue(self, player: wavelink.Player, entry: QueueEntry) -> bool:
+        """Запускает трек, если ничего не играет, иначе ставит в очередь. True - трек запущен."""
+        guild_id = player.guild.id
+
+        async def op():
+            if not player.playing:
+                await player.play(entry.track)
+                self.remember_track_info(guild_id, entry.track, entry.info)
+                return True
+            self.get_queue(guild_id).append(entry)
+            return False
+
+        return await self.get_actor(guild_id).run(op)
 
     def get_queue(self, guild_id: int):
         """Get or create queue for a guild."""
         if guild_id not in self.queues:
-            self.queues[guild_id] = []
+            self.queues[guild_id] = GuildQueue()
         return self.queues[guild_id]
 
+    def build_spotify(self):
+        """Асинхронный клиент Spotify поверх общего HTTP-клиента бота и кэш метаданных по названию."""
+        from music.metadata import SpotifyMetadata
+        from music.spotify import SpotifyClient
+
+        sp = SpotifyClient(
+            client_id=self.config["spotify_client_id"],
+            client_secret=self.config["spotify_client_secret"],
+            http=self.bot.http_service
+        )
+        return SpotifyMetadata(sp)
+
     async def get_track_info(self, track_title: str):
-        """Get track info from Spotify API"""
-        try:
-            # Search for the track on Spotify
-            results = self.sp.search(q=track_title, type='track', limit=1)
-            if results['tracks']['items']:
-                track = results['tracks']['items'][0]
-                return {
-                    'title': track['name'],
-                    'artist': track['artists'][0]['name'],
-                    'album': track['album']['name'],
-                    'cover_url': track['album']['images'][0]['url'] if track['album']['images'] else None,
-                    'spotify_url': track['external_urls']['spotify']
-                }
-        except Exception as e:
-            print(f"Error fetching Spotify info: {e}")
-        return None
+        """Get track info from Spotify API (без блокировки event loop)"""
+        spotify = await self.spotify.get()
+        return await spotify.track_info(track_title)
+
+    def get_history(self, guild_id: int) -> deque:
+        """Кольцевой буфер последних сыгранных треков гильдии."""
+        if guild_id not in self.previous_tracks:
+            self.previous_tracks[guild_id] = deque(maxlen=self.history_size)
+        return self.previous_tracks[guild_id]
+
+    def add_to_history(self, guild_id: int, track: wavelink.Playable):
+        history = self.get_history(guild_id)
+        # Повтор трека не должен забивать историю одинаковыми записями
+        if history and history[-1].track.encoded == track.encoded:
+            return
+        cached = self.now_playing.get(guild_id)
+        info = cached[1] if cached and cached[0] == track.encoded else None
+        history.append(QueueEntry(track, info))
+
+    def remember_track_info(self, guild_id: int, track: wavelink.Playable, track_info: dict):
+        """Запоминает уже известные метаданные трека, который начинает играть."""
+        if track_info:
+            self.now_playing[guild_id] = (track.encoded, track_info)
 
-    async def get_spotify_playlist_tracks(self, playlist_url: str, limit: int = 30):
-        """Extract tracks from Spotify playlist"""
+    async def get_current_track_info(self, player: wavelink.Player):
+        """Метаданные текущего трека: вычисляются один раз на трек."""
+        track = player.current
+        if not track:
+            return None
+
+        cached = self.now_playing.get(player.guild.id)
+        if cached and cached[0] == track.encoded:
+            return cached[1]
+
+        track_info = await self.get_track_info(track.title)
+        # Пока шёл запрос, трек мог смениться
+        if player.current and player.current.encoded == track.encoded:
+            self.now_playing[player.guild.id] = (track.encoded, track_info)
+        return track_info
+
+    async def get_spotify_playlist_tracks(self, playlist_url: str, limit: int = 0):
+        """Extract tracks from Spotify playlist.
+
+        Возвращает (треки первой страницы, генератор следующих страниц или
+        None) либо None при ошибке. Первая страница нужна, чтобы сразу
+        запустить трек; остальные догружаются в фоне. Всего не больше
+        `limit` треков (0 - весь плейлист).
+        """
         try:
             # Extract playlist ID from URL
             playlist_id = playlist_url.split('playlist/')[1].split('?')[0]
-            
-            # Get playlist tracks
-            results = self.sp.playlist_tracks(playlist_id, limit=limit)
-            tracks = []
-            
-            for item in results['items']:
-                track = item['track']
-                if track:
-                    # Формируем поисковый запрос для каждого трека
-                    query = f"{track['name']} {track['artists'][0]['name']}"
-                    tracks.append({
-                        'query': query,
-                        'title': track['name'],
-                        'artist': track['artists'][0]['name'],
-                        'album': track['album']['name'],
-                        'cover_url': track['album']['images'][0]['url'] if track['album']['images'] else None,
-                        'spotify_url': track['external_urls']['spotify']
-                    })
-            return tracks
+            sp = (await self.spotify.get()).sp
+            results = await sp.playlist_tracks(playlist_id, limit=100)
         except Exception as e:
             print(f"Error fetching Spotify playlist: {e}")
             return None
 
+        tracks = self.playlist_page_tracks(results, limit)
+        if not results.get('next') or (limit and len(tracks) >= limit):
+            return tracks, None
+        return tracks, self.playlist_next_pages(sp, results, limit, len(tracks))
+
+    @staticmethod
+    def playlist_page_tracks(results: dict, limit: int = 0) -> list:
+        """Треки одной страницы плейлиста Spotify (не больше limit, если он задан)."""
+        tracks = []
+        for item in results['items']:
+            track = item['track']
+            if track:
+                # Формируем поисковый запрос для каждого трека
+                query = f"{track['name']} {track['artists'][0]['name']}"
+                tracks.append({
+                    'query': query,
+                    'spotify_id': track['id'],
+                    'title': track['name'],
+                    'artist': track['artists'][0]['name'],
+                    'album': track['album']['name'],
+                    'cover_url': track['album']['images'][0]['url'] if track['album']['images'] else None,
+                    'spotify_url': track['external_urls']['spotify'],
+                    'duration_ms': track['duration_ms'],
+                    'isrc': track.get('external_ids', {}).get('isrc')
+                })
+                if limit and len(tracks) >= limit:
+                    break
+        return tracks
+
+    async def playlist_next_pages(self, sp, results: dict, limit: int, count: int):
+        """Следующие страницы плейлиста с ISRC, пока не наберётся limit треков."""
+        while not limit or count < limit:
+            results = await sp.next(results)
+            if not results:
+                return
+            tracks = self.playlist_page_tracks(results, limit - count if limit else 0)
+            await self.attach_isrcs(tracks)
+            count += len(tracks)
+            yield tracks
+
     async def get_spotify_album_tracks(self, album_url: str):
         """Extract all tracks from Spotify album"""
         try:
             # Extract album ID from URL
             album_id = album_url.split('album/')[1].split('?')[0]
             
-            # Get all album tracks
+            # Get all album tracks and album info (cover art and other details) at once
             tracks = []
-            results = self.sp.album_tracks(album_id)
-            
-            # Get album info for cover art and other details
-            album_info = self.sp.album(album_id)
-            
-            while results:
-                for item in results['items']:
-                    query = f"{item['name']} {item['artists'][0]['name']}"
-                    tracks.append({
-                        'query': query,
-                        'title': item['name'],
-                        'artist': item['artists'][0]['name'],
-                        'album': album_info['name'],
-                        'cover_url': album_info['images'][0]['url'] if album_info['images'] else None,
-                        'spotify_url': item['external_urls']['spotify']
-                    })
-                
-                if results['next']:
-                    results = self.sp.next(results)
-                else:
-                    results = None
-                    
+            sp = (await self.spotify.get()).sp
+            results, album_info = await asyncio.gather(
+                sp.album_tracks(album_id),
+                sp.album(album_id)
+            )
+
+            async for item in sp.paginate(results):
+                query = f"{item['name']} {item['artists'][0]['name']}"
+                tracks.append({
+                    'query': query,
+                    'spotify_id': item['id'],
+                    'title': item['name'],
+                    'artist': item['artists'][0]['name'],
+                    'album': album_info['name'],
+                    'cover_url': album_info['images'][0]['url'] if album_info['images'] else None,
+                    'spotify_url': item['external_urls']['spotify'],
+                    'duration_ms': item['duration_ms'],
+                    'isrc': None
+                })
+
+            # В треках альбома нет external_ids - ISRC запрашиваем отдельно
+            await self.attach_isrcs(tracks)
             return tracks
         except Exception as e:
             print(f"Error fetching Spotify album: {e}")
             return None
 
+    async def attach_isrcs(self, tracks_info: list):
+        """Дополняет треки ISRC пачечными запросами к Spotify.
+
+        Треки, которые уже есть в кэше, пропускаются: искать их не придётся.
+        """
+        missing = [
+            info for info in tracks_info
+            if not info.get('isrc') and info.get('spotify_id')
+            and TrackCache.make_key(info['query'], info['spotify_id']) not in self.track_cache
+        ]
+        if not missing:
+            return
+        spotify = await self.spotify.get()
+        isrcs = await spotify.track_isrcs([info['spotify_id'] for info in missing])
+        for info in missing:
+            info['isrc'] = isrcs.get(info['spotify_id'])
+
+    async def enqueue_spotify_tracks(self, interaction: discord.Interaction, player: wavelink.Player,
+                                     tracks_info: list, title: str, done_title: str):
+        """Параллельно ищет треки альбома/плейлиста и добавляет их в очередь в исходном порядке."""
+        embed = discord.Embed(
+            title=title,
+            description=f"Загрузка {len(tracks_info)} треков...",
+            color=discord.Color.blue()
+        )
+        message = await interaction.followup.send(embed=embed)
+        last_edit = time.monotonic()
+
+        async def on_progress(done: int, found: int, total: int):
+            nonlocal last_edit
+            # Не чаще раза в PROGRESS_EDIT_INTERVAL секунд, чтобы не упираться в rate limit
+            now = time.monotonic()
+            if done < total and now - last_edit < PROGRESS_EDIT_INTERVAL:
+                return
+            last_edit = now
+            embed.description = f"Найдено {found}/{total} треков (обработано {done})..."
+            try:
+                await message.edit(embed=embed)
+            except discord.HTTPException:
+                pass
+
+        added_tracks = 0
+        async for track, track_info in self.resolver.resolve_ordered(tracks_info, on_progress):
+            try:
+                await self.play_or_enqueue(player, QueueEntry(track, track_info))
+                added_tracks += 1
+            except Exception as e:
+                print(f"Error adding track {track_info['title']}: {e}")
+
+        final_embed = discord.Embed(
+            title=done_title,
+            description=f"Успешно добавлено {added_tracks} треков в очередь",
+            color=discord.Color.green()
+        )
+        final_embed.set_footer(text="Made with ❤️ by npcx42")
+        await message.edit(embed=final_embed)
+
+    async def stream_spotify_tracks(self, interaction: discord.Interaction, player: wavelink.Player,
+                                    tracks_info: list, more_pages=None):
+        """Потоковое добавление плейлиста.
+
+        Первый найденный трек сразу запускается, остальные попадают в очередь
+        заглушками PendingTrack и ищутся по мере приближения к ним. ISRC
+        первой страницы и следующие страницы (`more_pages`) догружаются в
+        фоне, уже после старта воспроизведения.
+        """
+        index = 0
+        started = None
+        if not player.playing:
+            # Ищем первый трек, который удаётся найти, и сразу запускаем его
+            while index < len(tracks_info) and started is None:
+                track_info = tracks_info[index]
+                index += 1
+                try:
+                    track = await self.resolver.search(
+                        track_info['query'], track_info.get('spotify_id'), track_info.get('isrc'), track_info['title']
+                    )
+                except Exception as e:
+                    print(f"Error adding track {track_info['title']}: {e}")
+                    continue
+                if track:
+                    if await self.play_or_enqueue(player, QueueEntry(track, track_info)):
+                        started = track_info
+                    break
+
+        placeholders = [QueueEntry(PendingTrack(track_info), track_info) for track_info in tracks_info[index:]]
+
+        async def append_placeholders():
+            queue = self.get_queue(interaction.guild_id)
+            for entry in placeholders:
+                queue.append(entry)
+
+        await self.get_actor(interaction.guild_id).run(append_placeholders)
+        self.schedule_lookahead(interaction.guild_id)
+
+        guild_tasks = self.playlist_tasks.setdefault(interaction.guild_id, set())
+        task = self.bot.loop.create_task(self.load_playlist_rest(interaction.guild_id, placeholders, more_pages))
+        guild_tasks.add(task)
+        task.add_done_callback(guild_tasks.discard)
+
+        description = f"В очередь добавлено {len(placeholders)} треков"
+        if more_pages is not None:
+            description += ", остальные догружаются"
+        embed = discord.Embed(
+            title="Плейлист добавлен",
+            description=description,
+            color=discord.Color.green()
+        )
+        if started:
+            embed.add_field(name="Сейчас играет", value=f"{started['title']} - {started['artist']}", inline=False)
+        embed.set_footer(text="Made with ❤️ by npcx42")
+        await interaction.followup.send(embed=embed)
+
+    async def load_playlist_rest(self, guild_id: int, placeholders: list, more_pages=None):
+        """Догружает плейлист, пока играет первый трек.
+
+        Дополняет ISRC заглушек первой страницы, затем добавляет в очередь
+        заглушки следующих страниц по мере их загрузки.
+        """
+        actor = self.get_actor(guild_id)
+        try:
+            await self.attach_isrcs([entry.info for entry in placeholders])
+
+            async def update_isrcs():
+                # attach_isrcs дополнил словари треков, заглушки хранят свою копию ISRC
+                for entry in placeholders:
+                    if entry.pending and not entry.track.isrc:
+                        entry.track.isrc = entry.info.get('isrc')
+
+            await actor.run(update_isrcs)
+            if more_pages is None:
+                return
+
+            async for tracks_info in more_pages:
+                async def append_page(tracks_info=tracks_info):
+                    queue = self.get_queue(guild_id)
+                    for track_info in tracks_info:
+                        queue.append(QueueEntry(PendingTrack(track_info), track_info))
+
+                await actor.run(append_page)
+                self.schedule_lookahead(guild_id)
+        except Exception as e:
+            print(f"Error loading Spotify playlist: {e}")
+
+    def schedule_lookahead(self, guild_id: int):
+        """Запускает подготовку ближайших треков очереди, если она ещё не идёт."""
+        task = self.lookahead_tasks.get(guild_id)
+        if task and not task.done():
+            return
+        self.lookahead_tasks[guild_id] = self.bot.loop.create_task(self.prefetch_ahead(guild_id))
+
+    async def prefetch_ahead(self, guild_id: int):
+        """Готовит первые lookahead_tracks треков очереди, пока играет текущий.
+
+        Находит заглушки в Lavalink и подгружает недостающие метаданные
+        Spotify, чтобы при смене трека оставалось только запустить его.
+        Поиск идёт параллельно, а найденное записывается в очередь через
+        актор гильдии, как и любое другое её изменение.
+        """
+        actor = self.get_actor(guild_id)
+        while True:
+            queue = self.queues.get(guild_id)
+            if not queue:
+                return
+            pending = [entry for entry in queue.page(0, self.lookahead_tracks) if entry.pending]
+            if not pending:
+                return
+
+            results = await asyncio.gather(
+                *(self.resolver.search(entry.track.query, entry.track.spotify_id, entry.track.isrc, entry.title)
+                  for entry in pending),
+                return_exceptions=True
+            )
+
+            async def apply_results():
+                for entry, result in zip(pending, results):
+                    # Пока шёл поиск, запись могла уйти из очереди или уже начать играть
+                    if not entry.pending or entry not in queue:
+                        continue
+                    if isinstance(result, wavelink.Playable):
+                        queue.resolve(entry, result)
+                    else:
+                        if isinstance(result, Exception):
+                            print(f"Error resolving track {entry.title}: {result}")
+                        queue.discard(entry)
+
+            await actor.run(apply_results)
+
+        queue = self.queues.get(guild_id)
+        missing = [entry for entry in queue.page(0, self.lookahead_tracks) if not entry.info] if queue else []
+        if missing:
+            infos = await asyncio.gather(
+                *(self.get_track_info(entry.title) for entry in missing),
+                return_exceptions=True
+            )
+
+            async def apply_infos():
+                for entry, info in zip(missing, infos):
+                    if isinstance(info, dict) and not entry.info:
+                        entry.info = info
+
+            await actor.run(apply_infos)
+
     @app_commands.command(name="play", description="Проигрывает музыку или плейлист Spotify")
     @app_commands.describe(
         query="Ссылка на трек/плейлист Spotify или поисковый запрос",
-        playlist_limit="Лимит треков для плейлиста (макс. 30)"
+        playlist_limit="Лимит треков для плейлиста (0 — весь плейлист)"
     )
-    async def play(self, interaction: discord.Interaction, query: str, playlist_limit: int = 30):
+    async def play(self, interaction: discord.Interaction, query: str, playlist_limit: int = 0):
         await interaction.response.defer()
 
         if not interaction.guild.voice_client:
             try:
                 channel = interaction.user.voice.channel
-                await channel.connect(cls=wavelink.Player)
+                await self.connect_player(channel)
             except AttributeError:
                 await interaction.followup.send("Вы должны быть в голосовом канале!")
                 return
@@ -154,7 +848,6 @@ class MusicCog(commands.Cog):
                 return
 
         player: wavelink.Player = interaction.guild.voice_client
-        queue = self.get_queue(interaction.guild_id)
 
         # Проверяем, является ли запрос ссылкой на альбом Spotify
         if "open.spotify.com/album" in query:
@@ -163,114 +856,45 @@ class MusicCog(commands.Cog):
                 await interaction.followup.send("Не удалось загрузить альбом Spotify.")
                 return
 
-            added_tracks = 0
-            embed = discord.Embed(
-                title="Добавление альбома",
-                description=f"Загрузка {len(tracks_info)} треков...",
-                color=discord.Color.blue()
-            )
-            message = await interaction.followup.send(embed=embed)
-
-            for track_info in tracks_info:
-                try:
-                    search_results = await wavelink.Playable.search(track_info['query'])
-                    if search_results:
-                        track = search_results[0]
-                        if not player.playing:
-                            await player.play(track)
-                            player.current_track_info = track_info
-                        else:
-                            queue.append((track, track_info))
-                        added_tracks += 1
-
-                        if added_tracks % 5 == 0:
-                            embed.description = f"Добавлено {added_tracks}/{len(tracks_info)} треков..."
-                            await message.edit(embed=embed)
-
-                except Exception as e:
-                    print(f"Error adding track {track_info['title']}: {e}")
-                    continue
-
-            final_embed = discord.Embed(
-                title="Альбом добавлен",
-                description=f"Успешно добавлено {added_tracks} треков в очередь",
-                color=discord.Color.green()
+            await self.enqueue_spotify_tracks(
+                interaction, player, tracks_info,
+                title="Добавление альбома", done_title="Альбом добавлен"
             )
-            final_embed.set_footer(text="Made with ❤️ by npcx42")
-            await message.edit(embed=embed)
             return
 
         # Проверяем, является ли запрос ссылкой на плейлист Spotify
         elif "open.spotify.com/playlist" in query:
-            # Ограничиваем максимальное количество треков
-            playlist_limit = min(playlist_limit, 30)
-            
-            tracks_info = await self.get_spotify_playlist_tracks(query, playlist_limit)
-            if not tracks_info:
+            playlist = await self.get_spotify_playlist_tracks(query, max(playlist_limit, 0))
+            if not playlist or not (playlist[0] or playlist[1]):
                 await interaction.followup.send("Не удалось загрузить плейлист Spotify.")
                 return
 
-            added_tracks = 0
-            embed = discord.Embed(
-                title="Добавление плейлиста",
-                description="Загрузка треков...",
-                color=discord.Color.blue()
-            )
-            message = await interaction.followup.send(embed=embed)
-
-            for track_info in tracks_info:
-                try:
-                    # Ищем каждый трек через wavelink
-                    search_results = await wavelink.Playable.search(track_info['query'])
-                    if search_results:
-                        track = search_results[0]
-                        if not player.playing:
-                            await player.play(track)
-                            player.current_track_info = track_info
-                        else:
-                            queue.append((track, track_info))
-                        added_tracks += 1
-
-                        # Обновляем embed каждые 5 треков
-                        if added_tracks % 5 == 0:
-                            embed.description = f"Добавлено {added_tracks}/{len(tracks_info)} треков..."
-                            await message.edit(embed=embed)
-
-                except Exception as e:
-                    print(f"Error adding track {track_info['title']}: {e}")
-                    continue
-
-            final_embed = discord.Embed(
-                title="Плейлист добавлен",
-                description=f"Успешно добавлено {added_tracks} треков в очередь",
-                color=discord.Color.green()
-            )
-            final_embed.set_footer(text="Made with ❤️ by npcx42")
-            await message.edit(embed=final_embed)
+            tracks_info, more_pages = playlist
+            await self.stream_spotify_tracks(interaction, player, tracks_info, more_pages)
             return
 
         # Обычное воспроизведение одного трека
         try:
-            search = await wavelink.Playable.search(query)
-            if not search:
+            track = self.pop_suggested_track(query)
+            if track:
+                self.track_cache.put(TrackCache.make_key(query), track)
+            else:
+                track = await self.resolver.search(query)
+            if not track:
                 await interaction.followup.send("Ничего не найдено!")
                 return
 
-            track = search[0]
-            queue = self.get_queue(interaction.guild_id)
             track_info = await self.get_track_info(track.title)
 
-            if player.playing:
-                queue.append(track)
+            if await self.play_or_enqueue(player, QueueEntry(track, track_info)):
                 embed = discord.Embed(
-                    title="Трек добавлен в очередь",
-                    color=discord.Color.blue()
+                    title="Сейчас играет",
+                    color=discord.Color.green()
                 )
             else:
-                await player.play(track)
                 embed = discord.Embed(
-                    title="Сейчас играет",
-                    color=discord.Color.green()
+                    title="Трек добавлен в очередь",
+                    color=discord.Color.blue()
                 )
 
             if track_info:
@@ -288,6 +912,38 @@ class MusicCog(commands.Cog):
         except Exception as e:
             await interaction.followup.send(f"Произошла ошибка: {e}")
 
+    async def autocomplete_search(self, query: str) -> list:
+        """Поиск вариантов для автодополнения /play через Lavalink."""
+        results = await wavelink.Playable.search(query)
+        if not results or isinstance(results, wavelink.Playlist):
+            return []
+
+        choices = []
+        for track in results[:10]:
+            # Значение варианта - ссылка на трек (лимит Discord - 100 символов)
+            if not track.uri or len(track.uri) > 100:
+                continue
+            # Выбранный вариант потом не придётся искать повторно
+            self.suggested_tracks[track.uri] = (time.monotonic() + SUGGESTED_TRACKS_TTL, track)
+            self.suggested_tracks.move_to_end(track.uri)
+            name = f"{track.title} - {track.author} ({format_time(track.length / 1000)})"
+            choices.append(app_commands.Choice(name=name[:100], value=track.uri))
+        while len(self.suggested_tracks) > SUGGESTED_TRACKS_SIZE:
+            self.suggested_tracks.popitem(last=False)
+        return choices
+
+    def pop_suggested_track(self, uri: str):
+        """Трек, который пользователь выбрал из подсказок /play (None, если его там нет)."""
+        entry = self.suggested_tracks.pop(uri.strip(), None)
+        if entry is None or entry[0] < time.monotonic():
+            return None
+        return entry[1]
+
+    @play.autocomplete("query")
+    async def play_query_autocomplete(self, interaction: discord.Interaction, current: str):
+        """Autocompletion for /play query."""
+        return await self.suggester.suggest(interaction.user.id, current)
+
     @app_commands.command(name="skip", description="Пропустить текущий трек")
     async def skip(self, interaction: discord.Interaction):
         player: wavelink.Player = interaction.guild.voice_client
@@ -295,12 +951,30 @@ class MusicCog(commands.Cog):
             await interaction.response.send_message("Бот не в голосовом канале!")
             return
 
-        if not player.playing:
-            await interaction.response.send_message("Сейчас ничего не играет!")
-            return
+        guild_id = interaction.guild_id
 
-        await player.stop()
-        await interaction.response.send_message("⏭️ Трек пропущен")
+        async def skip_tracks(count: int) -> int:
+            # Несколько /skip подряд пропускают столько же треков одним действием
+            if not player.playing:
+                return 0
+            queue = self.get_queue(guild_id)
+            looping = self.loop_mode.get(guild_id, "none") == "queue"
+            for _ in range(min(count - 1, len(queue))):
+                entry = queue.popleft()
+                if looping:
+                    queue.append(entry)
+            await player.stop()
+            return count
+
+        # Актор может быть занят, а Discord ждёт первый ответ не дольше 3 секунд
+        await interaction.response.defer()
+        skipped = await self.get_actor(guild_id).run_batched("skip", skip_tracks)
+        if not skipped:
+            await interaction.followup.send("Сейчас ничего не играет!")
+        elif skipped > 1:
+            await interaction.followup.send(f"⏭️ Пропущено треков: {skipped}")
+        else:
+            await interaction.followup.send("⏭️ Трек пропущен")
 
     @app_commands.command(name="pause", description="Приостановить воспроизведение")
     async def pause(self, interaction: discord.Interaction):
@@ -321,21 +995,8 @@ class MusicCog(commands.Cog):
             await interaction.response.send_message("Очередь пуста!")
             return
 
-        queue_list = "\n".join(
-            f"{i+1}. {track[0].title if isinstance(track, tuple) else track.title}" 
-            for i, track in enumerate(queue[:10])
-        )
-        
-        if len(queue) > 10:
-            queue_list += f"\n...и еще {len(queue) - 10} треков"
-
-        embed = discord.Embed(
-            title="Очередь воспроизведения",
-            description=queue_list,
-            color=discord.Color.blue()
-        )
-        embed.set_footer(text="Made with ❤️ by npcx42")
-        await interaction.response.send_message(embed=embed)
+        view = QueueView(self, interaction.guild_id)
+        await interaction.response.send_message(embed=view.build_embed(), view=view)
 
     @app_commands.command(name="stop", description="Остановить воспроизведение и очистить очередь")
     async def stop(self, interaction: discord.Interaction):
@@ -344,11 +1005,16 @@ class MusicCog(commands.Cog):
             await interaction.response.send_message("Бот не в голосовом канале!")
             return
 
-        # Очищаем очередь перед отключением
-        self.queues[interaction.guild_id] = []
-        await player.stop()
-        await player.disconnect()
-        await interaction.response.send_message("⏹️ Воспроизведение остановлено")
+        async def stop_player():
+            # Очищаем очередь перед отключением
+            self.get_queue(interaction.guild_id).clear()
+            await player.stop()
+            await player.disconnect()
+
+        await interaction.response.defer()
+        await self.get_actor(interaction.guild_id).run(stop_player)
+        self.release_guild(interaction.guild_id)
+        await interaction.followup.send("⏹️ Воспроизведение остановлено")
 
     @app_commands.command(name="seek", description="Перемотать трек на указанную позицию")
     @app_commands.describe(position="Позиция в формате MM:SS или количество секунд")
@@ -392,9 +1058,12 @@ class MusicCog(commands.Cog):
         if not queue:
             return await interaction.response.send_message("Очередь пуста!", ephemeral=True)
         
-        import random
-        random.shuffle(queue)
-        await interaction.response.send_message("🔀 Очередь перемешана")
+        async def shuffle_queue():
+            queue.shuffle()
+
+        await interaction.response.defer()
+        await self.get_actor(interaction.guild_id).run(shuffle_queue)
+        await interaction.followup.send("🔀 Очередь перемешана")
 
     @app_commands.command(name="remove", description="Удалить трек из очереди")
     @app_commands.describe(position="Позиция трека в очереди")
@@ -402,17 +1071,28 @@ class MusicCog(commands.Cog):
         queue = self.get_queue(interaction.guild_id)
         if not queue:
             return await interaction.response.send_message("Очередь пуста!", ephemeral=True)
+        if not 1 <= position <= len(queue):
+            return await interaction.response.send_message("Неверная позиция!", ephemeral=True)
         
+        async def remove_entry():
+            return queue.remove(position - 1)
+
+        await interaction.response.defer()
         try:
-            removed = queue.pop(position - 1)
-            await interaction.response.send_message(f"❌ Удалён трек: {removed.title}")
+            removed = await self.get_actor(interaction.guild_id).run(remove_entry)
+            await interaction.followup.send(f"❌ Удалён трек: {removed.title}")
         except IndexError:
-            await interaction.response.send_message("Неверная позиция!", ephemeral=True)
+            # Очередь успела измениться, пока команда ждала актор
+            await interaction.followup.send("Неверная позиция!")
 
     @app_commands.command(name="clear", description="Очистить очередь")
     async def clear(self, interaction: discord.Interaction):
-        self.queues[interaction.guild_id] = []
-        await interaction.response.send_message("🧹 Очередь очищена")
+        async def clear_queue():
+            self.get_queue(interaction.guild_id).clear()
+
+        await interaction.response.defer()
+        await self.get_actor(interaction.guild_id).run(clear_queue)
+        await interaction.followup.send("🧹 Очередь очищена")
 
     @app_commands.command(name="move", description="Переместить трек в очереди")
     @app_commands.describe(from_pos="Текущая позиция", to_pos="Новая позиция")
@@ -420,13 +1100,19 @@ class MusicCog(commands.Cog):
         queue = self.get_queue(interaction.guild_id)
         if not queue:
             return await interaction.response.send_message("Очередь пуста!", ephemeral=True)
+        if not (1 <= from_pos <= len(queue) and 1 <= to_pos <= len(queue)):
+            return await interaction.response.send_message("Неверная позиция!", ephemeral=True)
         
+        async def move_entry():
+            return queue.move(from_pos - 1, to_pos - 1)
+
+        await interaction.response.defer()
         try:
-            track = queue.pop(from_pos - 1)
-            queue.insert(to_pos - 1, track)
-            await interaction.response.send_message(f"↕️ Перемещён трек: {track.title}")
+            track = await self.get_actor(interaction.guild_id).run(move_entry)
+            await interaction.followup.send(f"↕️ Перемещён трек: {track.title}")
         except IndexError:
-            await interaction.response.send_message("Неверная позиция!", ephemeral=True)
+            # Очередь успела измениться, пока команда ждала актор
+            await interaction.followup.send("Неверная позиция!")
 
     @app_commands.command(name="nowplaying", description="Показать текущий трек")
     async def nowplaying(self, interaction: discord.Interaction):
@@ -443,8 +1129,8 @@ class MusicCog(commands.Cog):
         filled = int((position / duration) * bar_length)
         progress_bar = "▬" * filled + "🔘" + "▬" * (bar_length - filled)
 
-        # Получаем информацию о треке из Spotify
-        track_info = await self.get_track_info(track.title)
+        # Информация о треке из Spotify (считается один раз на трек)
+        track_info = await self.get_current_track_info(player)
         
         embed = discord.Embed(title="Сейчас играет", color=discord.Color.blue())
         
@@ -479,8 +1165,8 @@ class MusicCog(commands.Cog):
             return await interaction.response.send_message("Ничего не играет!", ephemeral=True)
 
         track = player.current
-        # Получаем информацию из Spotify
-        track_info = await self.get_track_info(track.title)
+        # Получаем информацию из Spotify (считается один раз на трек)
+        track_info = await self.get_current_track_info(player)
 
         embed = discord.Embed(
             title="💾 Сохранённый трек",
@@ -517,10 +1203,282 @@ class MusicCog(commands.Cog):
         if not query and (not player or not player.playing):
             return await interaction.response.send_message("Укажите название песни или включите музыку!", ephemeral=True)
 
-        search_query = query or player.current.title
-        # Здесь можно добавить интеграцию с Genius API для поиска текста
+        await interaction.response.defer()
+
+        if query:
+            track = None
+            artist, title, duration = "", query, 0
+        else:
+            track = player.current
+            # Метаданные Spotify дают более чистые исполнителя и название, чем YouTube
+            track_info = await self.get_current_track_info(player)
+            if track_info:
+                artist, title = track_info['artist'], track_info['title']
+            else:
+                artist, title = track.author, track.title
+            duration = track.length
+
+        lyrics = await self.lyrics_service.get(artist, title, duration)
+        if not lyrics:
+            return await interaction.followup.send("❌ Текст песни не найден")
 
-        await interaction.response.send_message("🎵 Функция поиска текста песни находится в разработке")
+        heading = f"{artist} — {title}" if artist else title
+        if not track or not lyrics.synced:
+            return await interaction.followup.send(embed=self.build_lyrics_embed(heading, lyrics))
+
+        # Синхронизированный текст: показываем текущую строку и ведём её за плеером
+        index = lyrics.line_index(player.position)
+        message = await interaction.followup.send(
+            embed=self.build_lyrics_embed(heading, lyrics, index), wait=True
+        )
+        guild_id = interaction.guild_id
+        previous = self.lyrics_tasks.pop(guild_id, None)
+        if previous and not previous.done():
+            previous.cancel()
+        self.lyrics_tasks[guild_id] = asyncio.create_task(
+            self.follow_lyrics(player, track.encoded, message, heading, lyrics, index)
+        )
+
+    def build_lyrics_embed(self, heading: str, lyrics, index: int = None) -> discord.Embed:
+        """Embed с текстом песни; для синхронизированного - окно вокруг строки index."""
+        embed = discord.Embed(title=f"🎤 {heading}", color=discord.Color.blue(), url=lyrics.url)
+        if index is None:
+            text = lyrics.plain
+            if len(text) > 4096:
+                text = text[:4095] + "…"
+            embed.description = text
+        else:
+            lines = [line or "♪" for _, line in lyrics.synced]
+            start = max(0, index - LYRICS_CONTEXT_BEFORE)
+            end = min(len(lines), max(index, 0) + LYRICS_CONTEXT_AFTER + 1)
+            embed.description = "\n".join(
+                f"**▶ {lines[i]}**" if i == index else lines[i] for i in range(start, end)
+            )
+        embed.set_footer(text=f"Источник: {lyrics.source}")
+        return embed
+
+    async def follow_lyrics(self, player: wavelink.Player, encoded: str, message: discord.WebhookMessage,
+                            heading: str, lyrics, shown: int):
+        """Обновляет текущую строку текста, пока играет тот же трек.
+
+        Сообщение правится только при смене строки и не чаще lyrics_edit_interval,
+        чтобы не упираться в лимиты Discord на редактирование.
+        """
+        guild_id = player.guild.id
+        last_edit = time.monotonic()
+        try:
+            while player.connected and player.current and player.current.encoded == encoded:
+                index = lyrics.line_index(player.position)
+                if index != shown:
+                    shown = index
+                    await message.edit(embed=self.build_lyrics_embed(heading, lyrics, index))
+                    last_edit = time.monotonic()
+
+                # Спим до следующей строки, но не меньше интервала правок и не дольше
+                # нескольких секунд, чтобы заметить паузу или перемотку
+                if shown + 1 < len(lyrics.synced):
+                    until_next = (lyrics.synced[shown + 1][0] - player.position) / 1000
+                else:
+                    until_next = self.lyrics_edit_interval
+                min_wait = self.lyrics_edit_interval - (time.monotonic() - last_edit)
+                await asyncio.sleep(min(max(until_next, min_wait, 0.1), 10))
+        except discord.HTTPException:
+            # Сообщение удалили или оно стало недоступно
+            pass
+        finally:
+            if self.lyrics_tasks.get(guild_id) is asyncio.current_task():
+                del self.lyrics_tasks[guild_id]
+
+    async def next_playable(self, queue: GuildQueue):
+        """Достаёт из очереди следующий трек, при необходимости находя заглушку."""
+        while queue:
+            entry = queue.popleft()
+            if not entry.pending:
+                self.prefetch_hits += 1
+            else:
+                # Предзагрузка не успела: ищем трек прямо сейчас
+                self.prefetch_misses += 1
+                try:
+                    track = await self.resolver.search(
+                        entry.track.query, entry.track.spotify_id, entry.track.isrc, entry.title
+                    )
+                except Exception as e:
+                    print(f"Error resolving track {entry.title}: {e}")
+                    continue
+                if not track:
+                    continue
+                entry.track = track
+            return entry
+        return None
+
+    @app_commands.command(name="back", description="Вернуться к предыдущему треку")
+    async def back(self, interaction: discord.Interaction):
+        player: wavelink.Player = interaction.guild.voice_client
+        if not player:
+            return await interaction.response.send_message("Бот не в голосовом канале!", ephemeral=True)
+
+        guild_id = interaction.guild_id
+
+        async def go_back():
+            history = self.get_history(guild_id)
+            if not history:
+                return None
+
+            previous = history.pop()
+            # Текущий трек встаёт первым в очередь, чтобы к нему можно было вернуться
+            if player.current:
+                queue = self.get_queue(guild_id)
+                cached = self.now_playing.get(guild_id)
+                info = cached[1] if cached and cached[0] == player.current.encoded else None
+                entry = QueueEntry(player.current, info)
+                # При повторе очереди текущий трек уже добавлен в её конец - переносим
+                # эту копию вперёд, иначе он будет играть дважды за круг
+                if self.loop_mode.get(guild_id, "none") == "queue" and queue:
+                    last = queue.peek(len(queue) - 1)
+                    if not last.pending and last.track.encoded == player.current.encoded:
+                        entry = queue.remove(len(queue) - 1)
+                queue.appendleft(entry)
+
+            # Трек уже загружен, повторный поиск не нужен
+            await player.play(previous.track, replace=True)
+            self.remember_track_info(guild_id, previous.track, previous.info)
+            return previous
+
+        if not self.get_history(guild_id):
+            return await interaction.response.send_message("История воспроизведения пуста!", ephemeral=True)
+
+        await interaction.response.defer()
+        previous = await self.get_actor(guild_id).run(go_back)
+        if previous is None:
+            return await interaction.followup.send("История воспроизведения пуста!")
+        await interaction.followup.send(f"⏮️ Возвращаемся к треку: {previous.title}")
+
+    @app_commands.command(name="history", description="Показать недавно сыгранные треки")
+    async def history(self, interaction: discord.Interaction):
+        history = self.get_history(interaction.guild_id)
+        if not history:
+            return await interaction.response.send_message("История воспроизведения пуста!", ephemeral=True)
+
+        # Последние сыгранные треки сверху
+        lines = [
+            f"{i + 1}. {entry.title} `{format_duration(entry.length)}`"
+            for i, entry in enumerate(reversed(history))
+            if i < QUEUE_PAGE_SIZE
+        ]
+        embed = discord.Embed(
+            title="История воспроизведения",
+            description="\n".join(lines),
+            color=discord.Color.blue()
+        )
+        embed.set_footer(text=f"Всего в истории: {len(history)} • Made with ❤️ by npcx42")
+        await interaction.response.send_message(embed=embed)
+
+    @app_commands.command(name="musicstats", description="Статистика музыкальной подсистемы (для отладки)")
+    async def musicstats(self, interaction: discord.Interaction):
+        if str(interaction.user.id) not in self.config.get("discord_debug_access_uid", []):
+            return await interaction.response.send_message("У вас нет прав для выполнения этой команды.", ephemeral=True)
+
+        cache_stats = self.track_cache.stats()
+        embed = discord.Embed(title="📊 Статистика музыки", color=discord.Color.blue())
+        embed.add_field(
+            name="Кэш треков",
+            value=(
+                f"Записей: {cache_stats['size']}/{cache_stats['capacity']}\n"
+                f"Попаданий: {cache_stats['hits']}\n"
+                f"Промахов: {cache_stats['misses']}\n"
+                f"Hit rate: {cache_stats['hit_rate']:.0%}"
+            ),
+            inline=True
+        )
+        gaps = self.gap_stats.summary()
+        prefetch_total = self.prefetch_hits + self.prefetch_misses
+        embed.add_field(
+            name="Паузы между треками",
+            value=(
+                f"Замеров: {gaps['count']}\n"
+                f"Среднее: {gaps['avg'] * 1000:.0f} мс\n"
+                f"p50/p95: {gaps['p50'] * 1000:.0f}/{gaps['p95'] * 1000:.0f} мс\n"
+                f"Максимум: {gaps['max'] * 1000:.0f} мс\n"
+                f"Предзагрузка: {self.prefetch_hits}/{prefetch_total}"
+            ),
+            inline=True
+        )
+        matches = self.resolver.matches
+        spotify = self.spotify.peek()
+        spotify_line = (
+            f"Запросов Spotify: {spotify.sp.requests} (429: {spotify.sp.rate_limited})"
+            if spotify else "Spotify ещё не использовался"
+        )
+        embed.add_field(
+            name="Поиск треков",
+            value=(
+                f"По ISRC: {matches['isrc']}\n"
+                f"Текстом: {matches['text']}\n"
+                f"Сомнительных: {matches['text_mismatch']}\n"
+                f"Не найдено: {matches['not_found']}\n"
+                f"Точность: {self.resolver.match_accuracy():.0%}\n"
+                f"{spotify_line}"
+            ),
+            inline=True
+        )
+        embed.add_field(
+            name="Плееры",
+            value=(
+                f"Активных: {sum(1 for vc in self.bot.voice_clients if isinstance(vc, wavelink.Player))}\n"
+                f"Слушателей: {sum(self.listener_counts.values())}\n"
+                f"Отключено по простою: {self.reaped_players}\n"
+                f"Операций через акторы: {sum(a.processed for a in self.actors.values())} "
+                f"(объединено: {sum(a.batched for a in self.actors.values())})"
+            ),
+            inline=True
+        )
+        nodes_status = "\n".join(
+            f"`{node.identifier}`: {node.status.name}, плееров: {len(node.players)}, "
+            f"нагрузка: {self.balancer.penalties.get(node.identifier, 0):.1f}"
+            for node in wavelink.Pool.nodes.values()
+        )
+        embed.add_field(name="Узлы Lavalink", value=nodes_status or "Нет узлов", inline=False)
+        embed.set_footer(text="Made with ❤️ by npcx42")
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    @commands.Cog.listener()
+    async def on_wavelink_node_ready(self, payload: wavelink.NodeReadyEventPayload):
+        # Хватает одного живого узла, остальные могут ещё подключаться
+        if not self.refresh_node_stats.is_running():
+            self.refresh_node_stats.start()
+        if not self.players_restored:
+            self.players_restored = True
+            await self.restore_players()
+
+    @commands.Cog.listener()
+    async def on_wavelink_node_disconnected(self, payload: wavelink.NodeDisconnectedEventPayload):
+        """Узел Lavalink отвалился: переносим его плееры на другие узлы"""
+        print(f"Узел Lavalink {payload.node.identifier} отключился")
+        self.balancer.penalties.pop(payload.node.identifier, None)
+        await self.failover_players(payload.node)
+
+    @commands.Cog.listener()
+    async def on_wavelink_track_start(self, payload: wavelink.TrackStartEventPayload):
+        """Заранее готовит следующие треки и метаданные трека, который начал играть"""
+        if payload.player and payload.player.guild:
+            ended = self.track_end_times.pop(payload.player.guild.id, None)
+            if ended is not None:
+                self.gap_stats.add(time.perf_counter() - ended)
+            self.schedule_lookahead(payload.player.guild.id)
+            self.bot.loop.create_task(self.get_current_track_info(payload.player))
+
+    @commands.Cog.listener()
+    async def on_voice_state_update(self, member: discord.Member, before: discord.VoiceState,
+                                    after: discord.VoiceState):
+        """Бот вышел из голосового канала (/stop, кик, отключение снаружи) - состояние гильдии больше не нужно"""
+        if member.id != self.bot.user.id or before.channel is None or after.channel is not None:
+            return
+        guild_id = member.guild.id
+        actor = self.actors.get(guild_id)
+        if actor:
+            # Сначала даём закончиться операции, которая отключила плеер
+            await actor.run(lambda: asyncio.sleep(0))
+        self.release_guild(guild_id)
 
     @commands.Cog.listener()
     async def on_wavelink_track_end(self, payload: wavelink.TrackEndEventPayload):
@@ -528,33 +1486,56 @@ class MusicCog(commands.Cog):
         player = payload.player
         guild_id = player.guild.id
 
+        # Плеер отключён (cleanup) или состояние гильдии уже освобождено:
+        # история и очередь не должны появиться заново
+        if payload.reason == "cleanup" or guild_id not in self.actors:
+            return
+
+        # Замена трека (например, через /back) в историю не попадает
+        if payload.track and payload.reason != "replaced":
+            self.add_to_history(guild_id, payload.track)
+
         # Проверяем существование очереди для гильдии
         if guild_id not in self.queues:
             return
 
-        if not player.playing and self.queues[guild_id]:
-            loop_mode = self.loop_mode.get(guild_id, "none")
-            queue = self.get_queue(guild_id)
+        # Пауза между треками считается с прихода события, включая ожидание актора
+        ended = time.perf_counter()
+        try:
+            # Переход к следующему треку идёт через актор, как и команды
+            await self.get_actor(guild_id).run(lambda: self.advance_queue(player, payload, ended))
+        except Exception as e:
+            print(f"Error in track_end handler: {e}")
 
-            try:
-                if loop_mode == "track" and player.current:
-                    await player.play(player.current)
-                elif loop_mode == "queue" and queue:
-                    track = queue.pop(0)
-                    if isinstance(track, tuple):
-                        await player.play(track[0])
-                        queue.append(track)
-                    else:
-                        await player.play(track)
-                        queue.append(track)
-                elif queue:
-                    track = queue.pop(0)
-                    if isinstance(track, tuple):
-                        await player.play(track[0])
-                    else:
-                        await player.play(track)
-            except Exception as e:
-                print(f"Error in track_end handler: {e}")
+    async def advance_queue(self, player: wavelink.Player, payload: wavelink.TrackEndEventPayload,
+                            ended: float):
+        """Запускает следующий трек после окончания текущего (ended - perf_counter() события)."""
+        guild_id = player.guild.id
+        # Пока событие ждало своей очереди, команда могла уже что-то запустить
+        if player.playing or not player.connected:
+            return
+
+        loop_mode = self.loop_mode.get(guild_id, "none")
+        queue = self.get_queue(guild_id)
+        if loop_mode == "track" and payload.reason == "finished":
+            self.track_end_times[guild_id] = ended
+            await player.play(payload.track)
+            return
+
+        if not queue:
+            return
+
+        # Пауза до старта следующего трека идёт с момента события
+        self.track_end_times[guild_id] = ended
+        entry = await self.next_playable(queue)
+        if not entry:
+            self.track_end_times.pop(guild_id, None)
+            return
+
+        await player.play(entry.track)
+        self.remember_track_info(guild_id, entry.track, entry.info)
+        if loop_mode == "queue":
+            queue.append(entry)
 
 async def setup(bot: commands.Bot):
     await bot.add_cog(MusicCog(bot))
@@ -1,39 +1,56 @@
-import json
-import requests
 from bs4 import BeautifulSoup
 import aiocron
 import discord
 from discord.ext import commands
 from discord import app_commands
 
+CONFIG_KEYS = ("channel_url", "discord_bot_id", "discord_channel_id", "discord_thread_name", "discord_debug_access_uid")
+
 class NeuralMeduza(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.last_message = None  # Память для последнего отправленного поста
         self.previous_message = None  # Добавляем хранение предыдущего сообщения
 
-        # Загрузка конфигурации из JSON файла
-        with open("config.json", encoding="utf-8") as f:
-            config = json.load(f)
-
-        self.CHANNEL_URL = config["channel_url"]
-        self.DISCORD_BOT_ID = int(config["discord_bot_id"])
-        self.DISCORD_CHANNEL_ID = int(config["discord_channel_id"])
-        self.DISCORD_THREAD_NAME = config["discord_thread_name"]
-        self.DISCORD_DEBUG_ACCESS = config["discord_debug_access_uid"]  # список id в виде строк
+        # Сообщения канала приходят через bot.message_router, маршрут меняется вместе с конфигом
+        self.channel_route = None
+        # Настройки берутся из общей конфигурации и обновляются при её изменении
+        self.apply_config(bot.config)
+        bot.config.subscribe(self.apply_config, keys=CONFIG_KEYS)
 
         self.start_channel_check()
 
-    def fetch_latest_message(self, channel_url: str) -> str or None:
+    def apply_config(self, config):
+        channel_url = config["channel_url"]
+        bot_id = config["discord_bot_id"]
+        channel_id = config["discord_channel_id"]
+        thread_name = config["discord_thread_name"]
+        self.CHANNEL_URL = channel_url
+        self.DISCORD_BOT_ID = bot_id
+        self.DISCORD_CHANNEL_ID = channel_id
+        self.DISCORD_THREAD_NAME = thread_name
+        self.DISCORD_DEBUG_ACCESS = config.get("discord_debug_access_uid", [])  # список id в виде строк
+
+        if self.channel_route:
+            self.bot.message_router.unregister(self.channel_route)
+        # Свои посты тоже нужны: под ними создаётся ветка
+        self.channel_route = self.bot.message_router.register(
+            self.on_channel_message, channels=[channel_id], ignore_self=False
+        )
+
+    async def cog_unload(self):
+        self.bot.config.unsubscribe(self.apply_config)
+        self.bot.message_router.unregister_owner(self)
+
+    async def fetch_latest_message(self, channel_url: str) -> str or None:
         """Запрашивает страницу канала и возвращает новый пост (если он отличается от предыдущего)."""
         try:
-            response = requests.get(channel_url)
-            response.raise_for_status()
+            html = await self.bot.http_service.get_text(channel_url)
         except Exception as e:
             print(f"Ошибка запроса: {e}")
             return None
 
-        soup = BeautifulSoup(response.content, "html.parser")
+        soup = BeautifulSoup(html, "html.parser")
         messages = soup.find_all("div", class_="tgme_widget_message_text")
         if not messages:
             return None
@@ -50,7 +67,7 @@ class NeuralMeduza(commands.Cog):
         """Планировщик, запускаемый по расписанию каждые 5 минут"""
         @aiocron.crontab("*/5 * * * *")
         async def scheduled_check():
-            new_text = self.fetch_latest_message(self.CHANNEL_URL)
+            new_text = await self.fetch_latest_message(self.CHANNEL_URL)
             if new_text:
                 channel = self.bot.get_channel(self.DISCORD_CHANNEL_ID)
                 if channel:
@@ -64,22 +81,16 @@ class NeuralMeduza(commands.Cog):
     async def on_ready(self):
         print(f"Logged in as {self.bot.user} (ID: {self.bot.user.id})")
 
-    @commands.Cog.listener()
-    async def on_message(self, message: discord.Message):
-        channelId = message.channel.id
-        userId = message.author.id
-        bot = message.author.bot
-
+    async def on_channel_message(self, message: discord.Message):
+        """Сообщения канала DISCORD_CHANNEL_ID (маршрутизатор передаёт только их)."""
         # Проверка, является ли сообщение от бота
-        if bot and userId == self.DISCORD_BOT_ID:
-            if channelId == self.DISCORD_CHANNEL_ID:
-                await message.create_thread(
-                    name=self.DISCORD_THREAD_NAME,
-                    reason="Разрешение на комментарии под сообщением"
-                )
+        if message.author.bot and message.author.id == self.DISCORD_BOT_ID:
+            await message.create_thread(
+                name=self.DISCORD_THREAD_NAME,
+                reason="Разрешение на комментарии под сообщением"
+            )
         else:
-            if channelId == self.DISCORD_CHANNEL_ID:
-                await message.delete()
+            await message.delete()
 
     @app_commands.command(name="debug", description="Проверить работу бота и получить сообщения из Telegram")
     async def debug_command(self, interaction: discord.Interaction):
@@ -87,7 +98,7 @@ class NeuralMeduza(commands.Cog):
             await interaction.response.send_message("У вас нет прав для выполнения этой команды.", ephemeral=True)
             return
         
-        new_text = self.fetch_latest_message(self.CHANNEL_URL)
+        new_text = await self.fetch_latest_message(self.CHANNEL_URL)
         response_msg = f"Бот работает.\n\n"
         response_msg += f"Ссылка на канал: {self.CHANNEL_URL}\n\n"
         
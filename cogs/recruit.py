@@ -3,27 +3,15 @@ from discord.ext import commands
 import json
 import os
 
-CONFIG_FILE = "config.json"
 APPLICATIONS_FILE = "data/applications.json"
 
 class Recruit(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        self.config = self.load_config()
+        # Общий ConfigService: ID каналов уже приведены к int
+        self.config = bot.config
         self.applications = self.load_applications()
 
-    def load_config(self):
-        if os.path.exists(CONFIG_FILE):
-            with open(CONFIG_FILE, "r", encoding="utf-8") as f:
-                config = json.load(f)
-                # Преобразуем ID каналов в int, если они переданы как строки
-                if "recruit_channel_id" in config:
-                    config["recruit_channel_id"] = int(config["recruit_channel_id"])
-                if "admin_channel_id" in config:
-                    config["admin_channel_id"] = int(config["admin_channel_id"])
-                return config
-        return {}
-
     def load_applications(self):
         if os.path.exists(APPLICATIONS_FILE):
             with open(APPLICATIONS_FILE, "r", encoding="utf-8") as f:
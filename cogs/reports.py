@@ -6,13 +6,12 @@ import os
 from datetime import datetime
 
 REPORTS_FILE = "data/reports.json"
-CONFIG_FILE = "config.json"
 
 class Reports(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
         self.reports = self.load_reports()  # Структура: {"reports": [...], "users_agreed": [...], "blocked_users": [...]}
-        self.config = self.load_config()
+        self.config = bot.config  # общий ConfigService: значения всегда актуальны
 
     def load_reports(self):
         if os.path.exists(REPORTS_FILE):
@@ -27,12 +26,6 @@ class Reports(commands.Cog):
         with open(REPORTS_FILE, "w", encoding="utf-8") as f:
             json.dump(self.reports, f, ensure_ascii=False, indent=4)
 
-    def load_config(self):
-        if os.path.exists(CONFIG_FILE):
-            with open(CONFIG_FILE, "r", encoding="utf-8") as f:
-                return json.load(f)
-        return {}
-
     def get_next_case_id(self):
         if self.reports["reports"]:
             return max(report["case_id"] for report in self.reports["reports"]) + 1
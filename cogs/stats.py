@@ -0,0 +1,127 @@
+import discord
+from discord.ext import commands
+from discord import app_commands
+from datetime import datetime
+
+# Сколько самых медленных команд и слушателей показывать
+TOP_HANDLERS = 10
+# Сколько последних зависаний цикла показывать в /stalls
+STALLS_SHOWN = 5
+
+
+def format_ms(seconds: float) -> str:
+    return f"{seconds * 1000:.0f}"
+
+
+class Stats(commands.Cog):
+    """Статистика производительности команд, слушателей и HTTP-запросов"""
+
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+
+    def is_debug_user(self, user: discord.abc.User) -> bool:
+        return str(user.id) in self.bot.config.get("discord_debug_access_uid", [])
+
+    def handler_lines(self, table: dict, prefix: str, first_name: str) -> list:
+        """Строки по обработчикам, начиная с самых медленных по p95."""
+        ordered = sorted(table.items(), key=lambda item: item[1].total.recent.summary()["p95"], reverse=True)
+        lines = []
+        for name, stats in ordered[:TOP_HANDLERS]:
+            total = stats.total.recent.summary()
+            first = stats.first.recent.summary()
+            line = (
+                f"`{prefix}{name}` — {stats.calls} выз., ошибок {stats.errors}, "
+                f"p50/p95 {format_ms(total['p50'])}/{format_ms(total['p95'])} мс"
+            )
+            if first["count"]:
+                line += f", {first_name} p95 {format_ms(first['p95'])} мс"
+            lines.append(line)
+        return lines
+
+    @staticmethod
+    def field_value(lines: list) -> str:
+        value = ""
+        for line in lines:
+            if len(value) + len(line) + 1 > 1024:
+                break
+            value += line + "\n"
+        return value or "Нет данных"
+
+    @app_commands.command(name="stats", description="Задержки команд и обработчиков (для отладки)")
+    async def stats_command(self, interaction: discord.Interaction):
+        if not self.is_debug_user(interaction.user):
+            await interaction.response.send_message("У вас нет прав для выполнения этой команды.", ephemeral=True)
+            return
+
+        metrics = self.bot.metrics
+        embed = discord.Embed(title="📈 Производительность бота", color=discord.Color.blue())
+        embed.add_field(
+            name="Команды (самые медленные)",
+            value=self.field_value(self.handler_lines(metrics.commands, "/", "ответ")),
+            inline=False
+        )
+        router = self.bot.message_router
+        embed.add_field(
+            name="Обработчики сообщений",
+            value=self.field_value(
+                self.handler_lines(metrics.listeners, "", "ожидание")
+                + [f"Маршрутизатор: сообщений {router.messages}, передано обработчикам {router.dispatched}"]
+            ),
+            inline=False
+        )
+
+        http_lines = [
+            f"`{host}` — {values['requests']} запр., ошибок {values['errors']}, повторов {values['retries']}, "
+            f"p50/p95 {format_ms(values['p50'])}/{format_ms(values['p95'])} мс"
+            for host, values in sorted(self.bot.http_service.metrics().items())
+        ]
+        embed.add_field(name="HTTP по хостам", value=self.field_value(http_lines), inline=False)
+
+        if self.bot.watchdog:
+            report = self.bot.watchdog.report(limit=1)
+            lag = report["lag"]
+            value = (
+                f"Задержка p50/p95/макс: {format_ms(lag['p50'])}/{format_ms(lag['p95'])}/{format_ms(lag['max'])} мс\n"
+                f"Зависаний > {format_ms(report['threshold'])} мс: {report['total_stalls']}"
+            )
+            if report["recent"]:
+                last = report["recent"][0]
+                value += f"\nПоследнее: {format_ms(last['duration'])} мс в `{last['blocking']}`"
+            embed.add_field(name="Event loop", value=value, inline=False)
+
+        if self.bot.metrics_server:
+            embed.set_footer(text=f"Prometheus: http://{self.bot.metrics_server.host}:{self.bot.metrics_server.port}/metrics")
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    @app_commands.command(name="stalls", description="Последние блокировки event loop со стеком (для отладки)")
+    async def stalls_command(self, interaction: discord.Interaction):
+        if not self.is_debug_user(interaction.user):
+            await interaction.response.send_message("У вас нет прав для выполнения этой команды.", ephemeral=True)
+            return
+        if not self.bot.watchdog:
+            await interaction.response.send_message("Сторожевой поток выключен (loop_stall_threshold).", ephemeral=True)
+            return
+
+        report = self.bot.watchdog.report(limit=STALLS_SHOWN)
+        if not report["recent"]:
+            await interaction.response.send_message("Зависаний event loop не было 🎉", ephemeral=True)
+            return
+
+        embed = discord.Embed(
+            title="🧊 Зависания event loop",
+            description=f"Всего: {report['total_stalls']}, порог {format_ms(report['threshold'])} мс",
+            color=discord.Color.orange()
+        )
+        for stall in report["recent"]:
+            stack = "\n".join(stall["stack"][-4:])
+            if len(stack) > 900:
+                stack = "…" + stack[-899:]
+            embed.add_field(
+                name=f"{datetime.fromtimestamp(stall['at']):%H:%M:%S} — {format_ms(stall['duration'])} мс, {stall['handler']}"[:256],
+                value=f"```\n{stack}\n```",
+                inline=False
+            )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(Stats(bot))
@@ -6,7 +6,7 @@ import qrcode
 from io import BytesIO
 import hashlib
 import asyncio
-import requests
+import aiohttp
 import re
 from datetime import datetime, timedelta
 import socket
@@ -14,16 +14,21 @@ import platform
 import subprocess
 from pythonping import ping as pyping
 import statistics
-import json
+from core.lazy import Lazy
 
-# Опциональные импорты
-try:
+
+def load_qr_decoder():
+    """Импортирует OpenCV (опциональная зависимость) при первом /qrdecode."""
     import cv2
     import numpy as np
-    CV2_AVAILABLE = True
-except ImportError:
-    CV2_AVAILABLE = False
-    print("OpenCV не установлен. Команда qrdecode будет недоступна.")
+
+    def decode(image_data: bytes) -> str:
+        nparr = np.frombuffer(image_data, np.uint8)
+        img = cv2.imdecode(nparr, cv2.IMREAD_GRAYSCALE)
+        data, bbox, _ = cv2.QRCodeDetector().detectAndDecode(img)
+        return data
+
+    return decode
 
 class Utils(commands.Cog):
     def __init__(self, bot: commands.Bot):
@@ -32,11 +37,7 @@ class Utils(commands.Cog):
         self.EXCHANGE_API_URL = "https://api.exchangerate-api.com/v4/latest/USD"
         self.exchange_rates = None
         self.last_rates_update = None
-
-        # Загружаем конфигурацию
-        with open("config.json", "r", encoding="utf-8") as f:
-            config = json.load(f)
-        self.weather_api_key = config.get("openweather_api_key")  # Добавляем API-ключ для OpenWeatherMap
+        self.qr_decoder = Lazy(load_qr_decoder, name="OpenCV (qrdecode)")
 
     @app_commands.command(name="base64", description="Кодировать или декодировать текст в Base64")
     @app_commands.describe(action="Выберите действие", text="Текст для кодирования или декодирования")
@@ -107,8 +108,7 @@ class Utils(commands.Cog):
     async def update_exchange_rates(self):
         """Обновляет курсы валют"""
         try:
-            response = requests.get(self.EXCHANGE_API_URL)
-            data = response.json()
+            data = await self.bot.http_service.get_json(self.EXCHANGE_API_URL)
             self.exchange_rates = data['rates']
             self.last_rates_update = datetime.now()
         except Exception as e:
@@ -340,24 +340,26 @@ class Utils(commands.Cog):
     @app_commands.describe(city="Название города")
     async def weather_command(self, interaction: discord.Interaction, city: str):
         """Показывает текущую погоду в указанном городе."""
-        if not self.weather_api_key:
+        weather_api_key = self.bot.config.get("openweather_api_key")
+        if not weather_api_key:
             await interaction.response.send_message("API-ключ для OpenWeatherMap не настроен.", ephemeral=True)
             return
 
-        url = f"http://api.openweathermap.org/data/2.5/weather?q={city}&appid={self.weather_api_key}&units=metric&lang=ru"
+        url = "http://api.openweathermap.org/data/2.5/weather"
+        params = {"q": city, "appid": weather_api_key, "units": "metric", "lang": "ru"}
         try:
-            response = requests.get(url)
-            if response.status_code == 401:
+            response = await self.bot.http_service.request("GET", url, params=params, raise_for_status=False)
+            if response.status == 401:
                 await interaction.response.send_message("Неверный API-ключ для OpenWeatherMap. Проверьте конфигурацию.", ephemeral=True)
                 return
-            elif response.status_code == 404:
+            elif response.status == 404:
                 await interaction.response.send_message(f"Город '{city}' не найден. Проверьте правильность написания.", ephemeral=True)
                 return
-            elif response.status_code != 200:
-                await interaction.response.send_message(f"Ошибка API OpenWeatherMap: {response.status_code} - {response.reason}", ephemeral=True)
+            elif response.status != 200:
+                await interaction.response.send_message(f"Ошибка API OpenWeatherMap: {response.status} - {response.data}", ephemeral=True)
                 return
 
-            data = response.json()
+            data = response.data
             weather = data["weather"][0]["description"].capitalize()
             temp = data["main"]["temp"]
             feels_like = data["main"]["feels_like"]
@@ -375,42 +377,38 @@ class Utils(commands.Cog):
             embed.set_footer(text="Данные предоставлены OpenWeatherMap")
 
             await interaction.response.send_message(embed=embed)
-        except requests.exceptions.RequestException as e:
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
             await interaction.response.send_message(f"Ошибка подключения к OpenWeatherMap: {e}", ephemeral=True)
         except Exception as e:
             await interaction.response.send_message(f"Произошла неизвестная ошибка: {e}", ephemeral=True)
 
-    # Изменяем декоратор для условного добавления команды
-    if CV2_AVAILABLE:
-        @app_commands.command(name="qrdecode", description="Расшифровать QR-код")
-        async def qrdecode_command(self, interaction: discord.Interaction, image: discord.Attachment):
-            if not image.content_type.startswith('image/'):
-                await interaction.response.send_message("Пожалуйста, отправьте изображение!", ephemeral=True)
-                return
+    # OpenCV импортируется только при первом вызове команды
+    @app_commands.command(name="qrdecode", description="Расшифровать QR-код")
+    async def qrdecode_command(self, interaction: discord.Interaction, image: discord.Attachment):
+        if not image.content_type or not image.content_type.startswith('image/'):
+            await interaction.response.send_message("Пожалуйста, отправьте изображение!", ephemeral=True)
+            return
 
-            try:
-                # Скачиваем изображение
-                image_data = await image.read()
-                nparr = np.frombuffer(image_data, np.uint8)
-                img = cv2.imdecode(nparr, cv2.IMREAD_GRAYSCALE)
-                
-                # Читаем QR-код
-                detector = cv2.QRCodeDetector()
-                data, bbox, _ = detector.detectAndDecode(img)
-                
-                if data:
-                    await interaction.response.send_message(f"Содержимое QR-кода:\n```\n{data}\n```")
-                else:
-                    await interaction.response.send_message("QR-код не найден!", ephemeral=True)
-            except Exception as e:
-                await interaction.response.send_message(f"Ошибка при чтении QR-кода: {e}", ephemeral=True)
-    else:
-        @app_commands.command(name="qrdecode", description="Расшифровать QR-код (Недоступно)")
-        async def qrdecode_command(self, interaction: discord.Interaction, image: discord.Attachment):
+        try:
+            decode = await self.qr_decoder.get()
+        except ImportError:
             await interaction.response.send_message(
                 "Эта команда недоступна. Установите opencv-python для её активации.",
                 ephemeral=True
             )
+            return
+
+        try:
+            # Скачиваем изображение и читаем QR-код вне event loop
+            image_data = await image.read()
+            data = await asyncio.to_thread(decode, image_data)
+
+            if data:
+                await interaction.response.send_message(f"Содержимое QR-кода:\n```\n{data}\n```")
+            else:
+                await interaction.response.send_message("QR-код не найден!", ephemeral=True)
+        except Exception as e:
+            await interaction.response.send_message(f"Ошибка при чтении QR-кода: {e}", ephemeral=True)
 
 async def setup(bot: commands.Bot):
     await bot.add_cog(Utils(bot))
\ No newline at end of file
@@ -0,0 +1 @@
+"""Общие сервисы бота, доступные всем когам."""
@@ -0,0 +1,99 @@
+"""Инкрементальная синхронизация слэш-команд по хэшу."""
+import asyncio
+import hashlib
+import json
+import os
+from typing import Dict, Iterable
+
+import discord
+from discord import app_commands
+
+HASHES_PATH = "data/command_hashes.json"
+# Одновременных синхронизаций: у каждой гильдии свой бакет, но есть и глобальный лимит
+SYNC_CONCURRENCY = 4
+
+
+class CommandSyncer:
+    """Синхронизирует команды только тех гильдий, где они изменились.
+
+    Для каждой гильдии считается sha256 того же payload, который отправил
+    бы tree.sync, и сохраняется в `path` после успешной синхронизации.
+    Перезапуск без изменений команд не делает ни одного запроса; чтобы
+    синхронизировать всё заново, достаточно удалить файл.
+    """
+
+    def __init__(self, tree: app_commands.CommandTree, path: str = HASHES_PATH,
+                 concurrency: int = SYNC_CONCURRENCY):
+        self.tree = tree
+        self.path = path
+        self.concurrency = concurrency
+        self._lock = asyncio.Lock()
+
+    async def payload_hash(self, guild: discord.abc.Snowflake) -> str:
+        commands = self.tree._get_all_commands(guild=guild)
+        translator = self.tree.translator
+        if translator:
+            payload = [await command.get_translated_payload(self.tree, translator) for command in commands]
+        else:
+            payload = [command.to_dict(self.tree) for command in commands]
+        # Порядок команд для Discord не важен - сортируем, чтобы хэш был стабильным
+        payload.sort(key=lambda command: (command.get("type", 1), command["name"]))
+        raw = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _load(self, application_id: int) -> Dict[str, str]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        # Хэши другого приложения (например, тестового бота) не подходят
+        if data.get("application_id") != application_id:
+            return {}
+        return data.get("guilds", {})
+
+    def _save(self, application_id: int, hashes: Dict[str, str]):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"application_id": application_id, "guilds": hashes}, f, indent=4)
+        os.replace(tmp_path, self.path)
+
+    async def sync(self, guild_ids: Iterable[int]) -> dict:
+        """Копирует глобальные команды в гильдии и синхронизирует изменившиеся.
+
+        Возвращает списки synced/skipped и словарь failed (гильдия -> ошибка).
+        """
+        async with self._lock:
+            application_id = self.tree.client.application_id
+            stored = await asyncio.to_thread(self._load, application_id)
+            hashes = dict(stored)
+            changed = {}
+            result = {"synced": [], "skipped": [], "failed": {}}
+
+            for guild_id in guild_ids:
+                guild = discord.Object(id=guild_id)
+                self.tree.copy_global_to(guild=guild)
+                digest = await self.payload_hash(guild)
+                if stored.get(str(guild_id)) == digest:
+                    result["skipped"].append(guild_id)
+                else:
+                    changed[guild_id] = digest
+
+            semaphore = asyncio.Semaphore(self.concurrency)
+
+            async def sync_guild(guild_id: int):
+                async with semaphore:
+                    try:
+                        await self.tree.sync(guild=discord.Object(id=guild_id))
+                    except Exception as e:
+                        # Хэш не сохраняем: при следующем запуске попробуем снова
+                        result["failed"][guild_id] = e
+                        return
+                hashes[str(guild_id)] = changed[guild_id]
+                result["synced"].append(guild_id)
+
+            await asyncio.gather(*(sync_guild(guild_id) for guild_id in changed))
+            if hashes != stored:
+                await asyncio.to_thread(self._save, application_id, hashes)
+            return result
@@ -0,0 +1,264 @@
+"""Единая конфигурация бота с проверкой типов и перечитыванием на лету."""
+import asyncio
+import inspect
+import json
+import os
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Tuple
+
+CONFIG_PATH = "config.json"
+# Как часто проверять mtime файла (сек.)
+POLL_INTERVAL = 5.0
+
+
+class ConfigError(Exception):
+    pass
+
+
+def _string(value):
+    if not isinstance(value, str):
+        raise ValueError("ожидается строка")
+    return value
+
+
+def _integer(value):
+    # ID из Discord часто записаны строкой - приводим к int
+    if isinstance(value, bool):
+        raise ValueError("ожидается целое число")
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str) and value.strip().isdigit():
+        return int(value)
+    raise ValueError("ожидается целое число")
+
+
+def _number(value):
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError("ожидается число")
+    return value
+
+
+def _id_list(value):
+    if not isinstance(value, list):
+        raise ValueError("ожидается список ID")
+    return [_integer(item) for item in value]
+
+
+def _uid_list(value):
+    # Коги сравнивают со str(user.id), поэтому храним строки
+    return [str(item) for item in _id_list(value)]
+
+
+def _list(value):
+    if not isinstance(value, list):
+        raise ValueError("ожидается список")
+    return value
+
+
+def _dict(value):
+    if not isinstance(value, dict):
+        raise ValueError("ожидается объект")
+    return value
+
+
+# Известные ключи и их приведение; остальные ключи передаются как есть
+FIELDS: Dict[str, Callable[[Any], Any]] = {
+    "token": _string,
+    "allowed_guilds": _id_list,
+    "discord_debug_access_uid": _uid_list,
+    "channel_url": _string,
+    "discord_bot_id": _integer,
+    "discord_channel_id": _integer,
+    "discord_thread_name": _string,
+    "admin_channel_id": _integer,
+    "recruit_channel_id": _integer,
+    "admin_response_channel_id": _integer,
+    "anonymous_reports_channel_id": _integer,
+    "suggestions_channel_id": _integer,
+    "groq_api_key": _string,
+    "gemini_api_key": _string,
+    "openweather_api_key": _string,
+    "spotify_client_id": _string,
+    "spotify_client_secret": _string,
+    "genius_token": _string,
+    "mongodb_uri": _string,
+    "mongodb_db": _string,
+    "lavalink_nodes": _list,
+    "lavalink_retries": _integer,
+    "music_search_concurrency": _integer,
+    "music_lookahead": _integer,
+    "track_cache_size": _integer,
+    "track_cache_ttl": _number,
+    "music_snapshot_interval": _number,
+    "music_idle_timeout": _number,
+    "music_autocomplete_debounce": _number,
+    "music_history_size": _integer,
+    "lyrics_edit_interval": _number,
+    "http_limit_per_host": _integer,
+    "http_host_limits": _dict,
+    "http_timeout": _number,
+    "http_retries": _integer,
+    "metrics_host": _string,
+    "metrics_port": _integer,
+    "loop_stall_threshold": _number,
+    "cog_load_timeout": _number,
+    "command_sync_concurrency": _integer,
+}
+REQUIRED = ("token",)
+
+
+def validate(raw: dict) -> Tuple[dict, List[str]]:
+    """Приводит известные ключи к нужным типам.
+
+    Возвращает конфиг без некорректных ключей и список ошибок.
+    """
+    if not isinstance(raw, dict):
+        return {}, ["корнем файла должен быть объект"]
+    data = dict(raw)
+    errors = []
+    for key in REQUIRED:
+        if not data.get(key):
+            errors.append(f"{key}: обязательный ключ")
+    for key, coerce in FIELDS.items():
+        if data.get(key) is None:
+            continue
+        try:
+            data[key] = coerce(data[key])
+        except (ValueError, TypeError) as e:
+            errors.append(f"{key}: {e} (сейчас {data[key]!r})")
+            del data[key]
+    return data, errors
+
+
+class ConfigService:
+    """config.json, прочитанный один раз и общий для всех когов.
+
+    Чтение - через get()/[] как у словаря; снимок конфигурации неизменяем
+    и заменяется целиком. После start() файл проверяется по mtime раз в
+    `poll_interval` секунд; если он изменился и прошёл проверку, новый
+    снимок подменяет старый, и подписчики, чьи ключи изменились,
+    получают его. Некорректный необязательный ключ, как и при запуске,
+    пропускается с предупреждением и сохраняет прежнее значение; файл
+    отвергается целиком, только если не прошёл проверку обязательный ключ.
+    """
+
+    def __init__(self, path: str = CONFIG_PATH, poll_interval: float = POLL_INTERVAL):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.reloads = 0
+        self.last_error: Optional[str] = None
+        self._subscribers: List[Tuple[Callable, Optional[frozenset]]] = []
+        self._task: Optional[asyncio.Task] = None
+
+        self._stamp = self._file_stamp()
+        data, errors = validate(self._read())
+        for error in errors:
+            if error.split(":")[0] in REQUIRED:
+                raise ConfigError(f"{self.path}: {error}")
+            # При запуске некорректный необязательный ключ не мешает остальным когам
+            print(f"Конфигурация: ключ пропущен, {error}")
+        self._data = MappingProxyType(data)
+
+    @property
+    def data(self) -> Mapping[str, Any]:
+        return self._data
+
+    def get(self, key: str, default=None):
+        return self._data.get(key, default)
+
+    def __getitem__(self, key: str):
+        return self._data[key]
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._data
+
+    def subscribe(self, callback: Callable[[Mapping[str, Any]], Any], keys: Optional[Iterable[str]] = None):
+        """Вызывает callback(конфиг) после перечитывания, если изменился один из `keys` (None - любой).
+
+        callback может быть корутиной.
+        """
+        self._subscribers.append((callback, frozenset(keys) if keys is not None else None))
+
+    def unsubscribe(self, callback: Callable):
+        self._subscribers = [(cb, keys) for cb, keys in self._subscribers if cb != callback]
+
+    def start(self):
+        """Запускает слежение за файлом. Вызывать из работающего event loop."""
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._watch(), name="config-watch")
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    def _file_stamp(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _read(self) -> dict:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            raise ConfigError(f"{self.path}: {e}") from e
+
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await self.reload()
+            except Exception as e:
+                print(f"Ошибка при перечитывании конфигурации: {e}")
+
+    async def reload(self, force: bool = False) -> bool:
+        """Перечитывает файл, если он изменился. Возвращает True, если конфиг обновлён."""
+        stamp = self._file_stamp()
+        if stamp is None or (stamp == self._stamp and not force):
+            return False
+        # Следующая проверка не будет перечитывать тот же файл, даже если он с ошибкой
+        self._stamp = stamp
+        try:
+            raw = await asyncio.to_thread(self._read)
+        except ConfigError as e:
+            self.last_error = str(e)
+            print(f"Конфигурация не обновлена: {e}")
+            return False
+        data, errors = validate(raw)
+        if any(error.split(":")[0] in REQUIRED for error in errors):
+            self.last_error = "; ".join(errors)
+            print(f"Конфигурация не обновлена: {self.last_error}")
+            return False
+
+        old = self._data
+        for error in errors:
+            key = error.split(":")[0]
+            if key in old:
+                data[key] = old[key]
+                print(f"Конфигурация: оставлено прежнее значение ключа, {error}")
+            else:
+                print(f"Конфигурация: ключ пропущен, {error}")
+        changed = {key for key in old.keys() | data.keys() if old.get(key) != data.get(key)}
+        self.last_error = "; ".join(errors) or None
+        if not changed:
+            return False
+        self._data = MappingProxyType(data)
+        self.reloads += 1
+        # Значения не печатаем - среди них токены и ключи API
+        print(f"Конфигурация обновлена, изменены ключи: {', '.join(sorted(changed))}")
+        await self._notify(changed)
+        return True
+
+    async def _notify(self, changed: set):
+        for callback, keys in list(self._subscribers):
+            if keys is not None and not keys & changed:
+                continue
+            try:
+                result = callback(self._data)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                print(f"Ошибка в подписчике конфигурации {getattr(callback, '__qualname__', callback)}: {e}")
@@ -0,0 +1,199 @@
+import asyncio
+import json
+import time
+from typing import Optional
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from core.stats import RollingStats
+
+# Статусы, после которых запрос имеет смысл повторить
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Методы, которые повторяются по умолчанию (повтор не создаст дубликатов)
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS"}
+# Дольше ждать Retry-After не будем - лучше вернуть ошибку
+MAX_RETRY_AFTER = 30
+
+
+class HTTPError(Exception):
+    """Ответ с кодом ошибки (после всех повторов)."""
+
+    def __init__(self, status: int, url: str, data=None):
+        super().__init__(f"HTTP {status} for {url}")
+        self.status = status
+        self.url = url
+        self.data = data
+
+
+class HTTPResponse:
+    """Прочитанный ответ: статус, заголовки и тело (json, текст или байты)."""
+
+    __slots__ = ('status', 'headers', 'data')
+
+    def __init__(self, status: int, headers, data):
+        self.status = status
+        self.headers = headers
+        self.data = data
+
+    @property
+    def ok(self) -> bool:
+        return 200 <= self.status < 300
+
+
+class HostStats:
+    """Счётчики и задержки запросов к одному хосту."""
+
+    __slots__ = ('requests', 'errors', 'retries', 'in_flight', 'latency')
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.in_flight = 0
+        self.latency = RollingStats()
+
+    def summary(self) -> dict:
+        latency = self.latency.summary()
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "retries": self.retries,
+            "in_flight": self.in_flight,
+            "avg": latency["avg"],
+            "p50": latency["p50"],
+            "p95": latency["p95"],
+            "max": latency["max"]
+        }
+
+
+class HTTPService:
+    """Общий асинхронный HTTP-клиент бота (bot.http_service).
+
+    Одна сессия с keep-alive пулом соединений и кэшем DNS, ограничение
+    одновременных запросов на хост, таймауты и повторы с отступом.
+    По каждому хосту собирается статистика задержек и ошибок.
+    """
+
+    def __init__(self, limit: int = 100, limit_per_host: int = 10, host_limits: Optional[dict] = None,
+                 timeout: float = 15, retries: int = 2, dns_ttl: int = 300):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.host_limits = host_limits or {}
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.retries = retries
+        self.dns_ttl = dns_ttl
+        self.stats = {}  # host -> HostStats
+        self._semaphores = {}  # host -> asyncio.Semaphore
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=self.limit,
+                    # Лимит на хост держат семафоры, у некоторых хостов он свой
+                    limit_per_host=0,
+                    ttl_dns_cache=self.dns_ttl,
+                    keepalive_timeout=30
+                ),
+                timeout=self.timeout
+            )
+        return self._session
+
+    async def close(self):
+        if self._session and not self._session.closed:
+            await self._session.close()
+
+    def _host_state(self, host: str):
+        if host not in self.stats:
+            self.stats[host] = HostStats()
+            self._semaphores[host] = asyncio.Semaphore(self.host_limits.get(host, self.limit_per_host))
+        return self.stats[host], self._semaphores[host]
+
+    async def request(self, method: str, url: str, *, read: str = "json", retries: Optional[int] = None,
+                      raise_for_status: bool = True, **kwargs) -> HTTPResponse:
+        """Выполняет запрос и читает тело ответа.
+
+        read - "json", "text" или "bytes". По умолчанию повторяются только
+        идемпотентные методы; для остальных число повторов задаётся явно.
+        Остальные аргументы передаются в aiohttp (params, json, headers, ...).
+        """
+        method = method.upper()
+        if retries is None:
+            retries = self.retries if method in IDEMPOTENT_METHODS else 0
+        host = urlsplit(url).hostname or ""
+        stats, semaphore = self._host_state(host)
+
+        attempt = 0
+        while True:
+            started = time.perf_counter()
+            stats.requests += 1
+            stats.in_flight += 1
+            try:
+                async with semaphore:
+                    async with self.session.request(method, url, **kwargs) as resp:
+                        response = HTTPResponse(resp.status, resp.headers, await self._read(resp, read))
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                stats.errors += 1
+                if attempt >= retries:
+                    raise
+                delay = 0.5 * 2 ** attempt
+            else:
+                if response.status in RETRY_STATUSES and attempt < retries:
+                    delay = self._retry_delay(response, attempt)
+                else:
+                    if not response.ok:
+                        stats.errors += 1
+                        if raise_for_status:
+                            raise HTTPError(response.status, url, response.data)
+                    return response
+            finally:
+                stats.in_flight -= 1
+                stats.latency.add(time.perf_counter() - started)
+
+            attempt += 1
+            stats.retries += 1
+            await asyncio.sleep(delay)
+
+    @staticmethod
+    async def _read(resp: aiohttp.ClientResponse, read: str):
+        if read == "bytes":
+            return await resp.read()
+        text = await resp.text()
+        if read == "text":
+            return text
+        if not text:
+            return None
+        try:
+            return json.loads(text)
+        except ValueError:
+            # Ошибки часто приходят текстом или HTML
+            return text
+
+    @staticmethod
+    def _retry_delay(response: HTTPResponse, attempt: int) -> float:
+        retry_after = response.headers.get("Retry-After")
+        if retry_after:
+            try:
+                return min(float(retry_after), MAX_RETRY_AFTER)
+            except ValueError:
+                pass
+        return 0.5 * 2 ** attempt
+
+    async def get_json(self, url: str, **kwargs):
+        return (await self.request("GET", url, read="json", **kwargs)).data
+
+    async def get_text(self, url: str, **kwargs) -> str:
+        return (await self.request("GET", url, read="text", **kwargs)).data
+
+    async def get_bytes(self, url: str, **kwargs) -> bytes:
+        return (await self.request("GET", url, read="bytes", **kwargs)).data
+
+    async def post_json(self, url: str, **kwargs):
+        return (await self.request("POST", url, read="json", **kwargs)).data
+
+    def metrics(self) -> dict:
+        """Статистика по хостам: запросы, ошибки, повторы и задержки (сек.)."""
+        return {host: stats.summary() for host, stats in self.stats.items()}
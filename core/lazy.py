@@ -0,0 +1,58 @@
+"""Ленивая активация тяжёлых подсистем при первом использовании."""
+import asyncio
+import time
+from typing import Callable, Generic, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class Lazy(Generic[T]):
+    """Ресурс, который создаётся при первом обращении.
+
+    `factory` импортирует тяжёлый модуль и строит клиент; она выполняется
+    в потоке один раз, одновременные первые вызовы get() ждут одну и ту же
+    активацию. ImportError запоминается (модуль не появится до
+    перезапуска), другие ошибки - нет: следующий get() попробует снова.
+    """
+
+    def __init__(self, factory: Callable[[], T], name: str):
+        self.factory = factory
+        self.name = name
+        self.activated_in: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+        self._import_error: Optional[ImportError] = None
+
+    @property
+    def ready(self) -> bool:
+        return (
+            self._task is not None and self._task.done()
+            and not self._task.cancelled() and self._task.exception() is None
+        )
+
+    def peek(self) -> Optional[T]:
+        """Готовое значение без активации (None, если ещё не нужно было)."""
+        return self._task.result() if self.ready else None
+
+    async def get(self) -> T:
+        if self._import_error is not None:
+            raise self._import_error
+        if self._task is None:
+            self._task = asyncio.create_task(self._activate(), name=f"lazy:{self.name}")
+        task = self._task
+        try:
+            # shield: отмена одного ожидающего не должна прерывать активацию для остальных
+            return await asyncio.shield(task)
+        except ImportError as e:
+            self._import_error = e
+            raise
+        except Exception:
+            if task.done() and self._task is task:
+                self._task = None
+            raise
+
+    async def _activate(self) -> T:
+        started = time.perf_counter()
+        value = await asyncio.to_thread(self.factory)
+        self.activated_in = time.perf_counter() - started
+        print(f"Активирован {self.name} за {self.activated_in:.2f} с")
+        return value
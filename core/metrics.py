@@ -0,0 +1,254 @@
+import asyncio
+import time
+from typing import Optional
+
+import discord
+from aiohttp import web
+from discord import app_commands
+
+from core.stats import RollingStats
+
+# Границы корзин гистограмм задержек (сек.), как у клиентов Prometheus
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# События, обработчики которых замеряются по отдельности
+INSTRUMENTED_EVENTS = {"on_message"}
+
+
+class Histogram:
+    """Гистограмма задержек для Prometheus и последние замеры для перцентилей."""
+
+    __slots__ = ('counts', 'sum', 'count', 'recent')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.recent = RollingStats()
+
+    def observe(self, value: float):
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += value
+        self.count += 1
+        self.recent.add(value)
+
+    def cumulative(self) -> list:
+        """Пары (граница, сколько замеров не больше неё), последняя - +Inf."""
+        result = []
+        total = 0
+        for bound, count in zip(BUCKETS + (float("inf"),), self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+
+class HandlerStats:
+    """Статистика одного обработчика: вызовы, ошибки и две задержки.
+
+    Для команд first - время до первого ответа (defer или сообщение), для
+    слушателей - ожидание от постановки события в очередь до запуска.
+    """
+
+    __slots__ = ('calls', 'errors', 'first', 'total')
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.first = Histogram()
+        self.total = Histogram()
+
+
+class MetricsRegistry:
+    """Метрики команд и слушателей бота (bot.metrics)."""
+
+    def __init__(self):
+        self.commands = {}  # имя команды -> HandlerStats
+        self.listeners = {}  # "событие:Ког.метод" -> HandlerStats
+
+    @staticmethod
+    def _stats(table: dict, name: str) -> HandlerStats:
+        if name not in table:
+            table[name] = HandlerStats()
+        return table[name]
+
+    def record_command(self, name: str, first: Optional[float], total: float, failed: bool):
+        stats = self._stats(self.commands, name)
+        stats.calls += 1
+        if failed:
+            stats.errors += 1
+        if first is not None:
+            stats.first.observe(first)
+        stats.total.observe(total)
+
+    def record_listener(self, name: str, delay: float, total: float, failed: bool):
+        stats = self._stats(self.listeners, name)
+        stats.calls += 1
+        if failed:
+            stats.errors += 1
+        stats.first.observe(delay)
+        stats.total.observe(total)
+
+
+class TimedInteractionResponse(discord.InteractionResponse):
+    """InteractionResponse, запоминающий момент первого ответа."""
+
+    __slots__ = ('_type', 'responded_at')
+
+    @property
+    def _response_type(self):
+        return self._type
+
+    @_response_type.setter
+    def _response_type(self, value):
+        if value is not None and self._type is None:
+            self.responded_at = time.perf_counter()
+        self._type = value
+
+    def __init__(self, parent: discord.Interaction):
+        self._type = None
+        self.responded_at = None
+        super().__init__(parent)
+
+
+class InstrumentedCommandTree(app_commands.CommandTree):
+    """CommandTree, который замеряет каждую слэш-команду и автодополнение."""
+
+    async def _call(self, interaction: discord.Interaction):
+        started = time.perf_counter()
+        # Имя задачи показывает сторожевой поток, если команда заблокирует цикл
+        task = asyncio.current_task()
+        if task is not None:
+            task.set_name(f"command:/{(interaction.data or {}).get('name', 'unknown')}")
+        # Подменяем кэшированный interaction.response, чтобы знать время первого ответа
+        response = TimedInteractionResponse(interaction)
+        interaction._cs_response = response
+        try:
+            await super()._call(interaction)
+        except Exception:
+            interaction.command_failed = True
+            raise
+        finally:
+            self._record(interaction, started, response)
+
+    def _record(self, interaction: discord.Interaction, started: float, response: TimedInteractionResponse):
+        metrics = getattr(self.client, "metrics", None)
+        if metrics is None:
+            return
+        command = interaction.command
+        name = command.qualified_name if command else (interaction.data or {}).get("name", "unknown")
+        if interaction.type is discord.InteractionType.autocomplete:
+            name = f"{name} (autocomplete)"
+        first = response.responded_at - started if response.responded_at else None
+        metrics.record_command(name, first, time.perf_counter() - started, interaction.command_failed)
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def _render_histogram(lines: list, metric: str, label: str, name: str, histogram: Histogram):
+    for bound, count in histogram.cumulative():
+        le = "+Inf" if bound == float("inf") else repr(bound)
+        lines.append(f'{metric}_bucket{{{label}="{_label(name)}",le="{le}"}} {count}')
+    lines.append(f'{metric}_sum{{{label}="{_label(name)}"}} {histogram.sum}')
+    lines.append(f'{metric}_count{{{label}="{_label(name)}"}} {histogram.count}')
+
+
+def render_prometheus(metrics: MetricsRegistry, http_metrics: Optional[dict] = None,
+                      loop_report: Optional[dict] = None) -> str:
+    """Текстовый формат Prometheus для всех метрик бота."""
+    lines = []
+    for table, label, prefix, first_help in (
+        (metrics.commands, "command", "icutils_command", "Время до первого ответа на команду"),
+        (metrics.listeners, "listener", "icutils_listener", "Ожидание запуска обработчика события")
+    ):
+        lines.append(f"# TYPE {prefix}_calls_total counter")
+        for name, stats in table.items():
+            lines.append(f'{prefix}_calls_total{{{label}="{_label(name)}"}} {stats.calls}')
+        lines.append(f"# TYPE {prefix}_errors_total counter")
+        for name, stats in table.items():
+            lines.append(f'{prefix}_errors_total{{{label}="{_label(name)}"}} {stats.errors}')
+        first_metric = f"{prefix}_{'defer' if label == 'command' else 'delay'}_seconds"
+        lines.append(f"# HELP {first_metric} {first_help}")
+        lines.append(f"# TYPE {first_metric} histogram")
+        for name, stats in table.items():
+            _render_histogram(lines, first_metric, label, name, stats.first)
+        lines.append(f"# TYPE {prefix}_duration_seconds histogram")
+        for name, stats in table.items():
+            _render_histogram(lines, f"{prefix}_duration_seconds", label, name, stats.total)
+
+    if http_metrics:
+        for key, kind in (("requests", "counter"), ("errors", "counter"), ("retries", "counter"), ("in_flight", "gauge")):
+            metric = f"icutils_http_{key}" + ("_total" if kind == "counter" else "")
+            lines.append(f"# TYPE {metric} {kind}")
+            for host, values in http_metrics.items():
+                lines.append(f'{metric}{{host="{_label(host)}"}} {values[key]}')
+        lines.append("# TYPE icutils_http_latency_seconds summary")
+        for host, values in http_metrics.items():
+            for quantile, key in (("0.5", "p50"), ("0.95", "p95")):
+                lines.append(f'icutils_http_latency_seconds{{host="{_label(host)}",quantile="{quantile}"}} {values[key]}')
+
+    if loop_report:
+        lines.append("# TYPE icutils_loop_lag_seconds summary")
+        for quantile, key in (("0.5", "p50"), ("0.95", "p95")):
+            lines.append(f'icutils_loop_lag_seconds{{quantile="{quantile}"}} {loop_report["lag"][key]}')
+        lines.append("# TYPE icutils_loop_stalls_total counter")
+        lines.append(f"icutils_loop_stalls_total {loop_report['total_stalls']}")
+    return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    """Локальный HTTP-эндпоинт /metrics в формате Prometheus."""
+
+    def __init__(self, bot, host: str = "127.0.0.1", port: int = 9108):
+        self.bot = bot
+        self.host = host
+        self.port = port
+        self._runner: Optional[web.AppRunner] = None
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/metrics", self.handle_metrics)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+
+    async def close(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    async def handle_metrics(self, request: web.Request):
+        http_service = getattr(self.bot, "http_service", None)
+        watchdog = getattr(self.bot, "watchdog", None)
+        body = render_prometheus(
+            self.bot.metrics,
+            http_service.metrics() if http_service else None,
+            watchdog.report(limit=0) if watchdog else None
+        )
+        return web.Response(text=body, content_type="text/plain", charset="utf-8")
+
+
+def timed_listener(metrics: MetricsRegistry, coro, event_name: str):
+    """Оборачивает обработчик события, чтобы записать его задержку и время работы."""
+    scheduled = time.perf_counter()
+    name = f"{event_name}:{getattr(coro, '__qualname__', repr(coro))}"
+
+    async def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        task = asyncio.current_task()
+        if task is not None:
+            task.set_name(f"listener:{name}")
+        failed = False
+        try:
+            await coro(*args, **kwargs)
+        except Exception:
+            failed = True
+            raise
+        finally:
+            metrics.record_listener(name, started - scheduled, time.perf_counter() - started, failed)
+
+    return wrapper
@@ -0,0 +1,139 @@
+"""Индексированная рассылка on_message по когам."""
+from collections import defaultdict
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+import discord
+
+AUTHOR_KINDS = ("any", "users", "bots")
+# Сколько пар (гильдия, канал) держать в кэше планов; ЛС могут плодить новые
+PLAN_CACHE_SIZE = 10000
+
+
+class MessageRoute:
+    """Интерес обработчика к сообщениям: где они написаны и кем."""
+
+    __slots__ = ("handler", "order", "channels", "guilds", "mention", "authors", "guild_only", "ignore_self")
+
+    def __init__(self, handler: Callable[[discord.Message], Awaitable[None]], order: int, *,
+                 channels: Optional[Iterable[int]] = None, guilds: Optional[Iterable[int]] = None,
+                 mention: bool = False, authors: str = "any", guild_only: bool = False,
+                 ignore_self: bool = True):
+        if authors not in AUTHOR_KINDS:
+            raise ValueError(f"authors должен быть одним из {AUTHOR_KINDS}")
+        if mention and (channels is not None or guilds is not None):
+            raise ValueError("mention нельзя сочетать с channels/guilds")
+        self.handler = handler
+        self.order = order
+        self.channels = frozenset(channels) if channels is not None else None
+        self.guilds = frozenset(guilds) if guilds is not None else None
+        self.mention = mention
+        self.authors = authors
+        self.guild_only = guild_only
+        self.ignore_self = ignore_self
+
+    def accepts_author(self, is_self: bool, is_bot: bool) -> bool:
+        if self.ignore_self and is_self:
+            return False
+        if self.authors == "users":
+            return not is_bot
+        if self.authors == "bots":
+            return is_bot
+        return True
+
+
+class MessageRouter:
+    """Передаёт сообщение только тем обработчикам, которым оно интересно.
+
+    Коги регистрируют обработчик с фильтром: каналы, гильдии, упоминание
+    бота или все сообщения, плюс тип автора. По фильтрам строятся таблицы
+    канал -> обработчики и гильдия -> обработчики, а для каждой пары
+    (гильдия, канал) один раз собирается план. Сообщение, которое никому
+    не нужно, стоит одного поиска в словаре и не создаёт задач.
+    Подходящие обработчики запускаются через bot._schedule_event, как
+    обычные слушатели on_message: с on_error и метриками core.metrics.
+    """
+
+    def __init__(self, bot: discord.Client):
+        self.bot = bot
+        self.messages = 0
+        self.dispatched = 0
+        self._routes: List[MessageRoute] = []
+        self._next_order = 0
+        self._by_channel: Dict[int, List[MessageRoute]] = {}
+        self._by_guild: Dict[int, List[MessageRoute]] = {}
+        self._everywhere: List[MessageRoute] = []
+        self._mention: Tuple[MessageRoute, ...] = ()
+        self._plans: Dict[Tuple[Optional[int], int], Tuple[MessageRoute, ...]] = {}
+
+    def register(self, handler: Callable[[discord.Message], Awaitable[None]], **interest) -> MessageRoute:
+        """Регистрирует обработчик; без channels/guilds/mention он получает все сообщения.
+
+        Параметры интереса - как у MessageRoute. Возвращает маршрут для unregister().
+        """
+        route = MessageRoute(handler, self._next_order, **interest)
+        self._next_order += 1
+        self._routes.append(route)
+        self._rebuild()
+        return route
+
+    def unregister(self, route: MessageRoute):
+        if route in self._routes:
+            self._routes.remove(route)
+            self._rebuild()
+
+    def unregister_owner(self, owner):
+        """Снимает все обработчики-методы объекта (обычно кога в cog_unload)."""
+        self._routes = [route for route in self._routes if getattr(route.handler, "__self__", None) is not owner]
+        self._rebuild()
+
+    def _rebuild(self):
+        by_channel = defaultdict(list)
+        by_guild = defaultdict(list)
+        everywhere = []
+        mention = []
+        for route in self._routes:
+            if route.mention:
+                mention.append(route)
+            elif route.channels is not None:
+                for channel_id in route.channels:
+                    by_channel[channel_id].append(route)
+            elif route.guilds is not None:
+                for guild_id in route.guilds:
+                    by_guild[guild_id].append(route)
+            else:
+                everywhere.append(route)
+        self._by_channel = dict(by_channel)
+        self._by_guild = dict(by_guild)
+        self._everywhere = everywhere
+        self._mention = tuple(mention)
+        self._plans = {}
+
+    def _plan(self, guild_id: Optional[int], channel_id: int) -> Tuple[MessageRoute, ...]:
+        routes = self._by_channel.get(channel_id, []) + self._by_guild.get(guild_id, []) + self._everywhere
+        if guild_id is None:
+            routes = [route for route in routes if not route.guild_only]
+        return tuple(sorted(routes, key=lambda route: route.order))
+
+    def dispatch(self, message: discord.Message):
+        self.messages += 1
+        guild_id = message.guild.id if message.guild else None
+        key = (guild_id, message.channel.id)
+        plan = self._plans.get(key)
+        if plan is None:
+            if len(self._plans) >= PLAN_CACHE_SIZE:
+                self._plans.clear()
+            plan = self._plans[key] = self._plan(guild_id, message.channel.id)
+
+        if self._mention and (message.mentions or message.role_mentions or message.mention_everyone) \
+                and self.bot.user.mentioned_in(message):
+            extra = tuple(route for route in self._mention if not (route.guild_only and guild_id is None))
+            plan = tuple(sorted(plan + extra, key=lambda route: route.order))
+        if not plan:
+            return
+
+        is_self = message.author.id == self.bot.user.id
+        is_bot = message.author.bot
+        for route in plan:
+            if route.accepts_author(is_self, is_bot):
+                self.dispatched += 1
+                self.bot._schedule_event(route.handler, "on_message", message)
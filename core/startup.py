@@ -0,0 +1,171 @@
+"""Параллельная загрузка когов и профиль запуска."""
+import ast
+import asyncio
+import importlib
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional
+
+PROFILE_PATH = "data/startup_profile.json"
+# Сколько ждать медленный ког, прежде чем продолжить запуск без него
+COG_LOAD_TIMEOUT = 10.0
+
+
+def module_imports(path: str) -> List[str]:
+    """Модули, которые файл импортирует при загрузке.
+
+    Смотрим только верхний уровень модуля (включая try/if/with): импорты
+    внутри функций и так отложены. Стандартная библиотека и сами коги не
+    нужны - их импорт дешёвый или выполнит load_extension.
+    """
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read(), filename=path)
+
+    names = []
+
+    def visit(body):
+        for node in body:
+            if isinstance(node, ast.Import):
+                names.extend(alias.name for alias in node.names)
+            elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+                names.append(node.module)
+            elif isinstance(node, (ast.If, ast.Try, ast.With)):
+                visit(node.body)
+                visit(getattr(node, "orelse", []))
+                visit(getattr(node, "finalbody", []))
+                for handler in getattr(node, "handlers", []):
+                    visit(handler.body)
+
+    visit(tree.body)
+    return [
+        name for name in dict.fromkeys(names)
+        if name.split(".")[0] not in sys.stdlib_module_names and name.split(".")[0] != "cogs"
+    ]
+
+
+def _import_module(name: str) -> dict:
+    started = time.perf_counter()
+    try:
+        importlib.import_module(name)
+        error = None
+    except Exception as e:
+        # Ког сам решает, что делать без модуля (например, cv2 в utils)
+        error = f"{type(e).__name__}: {e}"
+    return {"time": time.perf_counter() - started, "error": error}
+
+
+class CogLoader:
+    """Загружает коги параллельно и меряет, сколько стоил каждый.
+
+    Тяжёлые сторонние импорты (wavelink, bs4, google.generativeai, cv2)
+    прогреваются в потоках заранее, поэтому сам load_extension выполняет
+    уже закэшированные импорты. Коги грузятся одновременно: ошибка одного
+    не мешает остальным, а ког, не успевший за `timeout`, догружается в
+    фоне, и о нём сообщает `on_late`.
+    """
+
+    def __init__(self, bot, directory: str = "cogs", timeout: float = COG_LOAD_TIMEOUT,
+                 profile_path: str = PROFILE_PATH,
+                 on_late: Optional[Callable[[dict], Awaitable[None]]] = None):
+        self.bot = bot
+        self.directory = directory
+        self.timeout = timeout
+        self.profile_path = profile_path
+        self.on_late = on_late
+        self.modules: Dict[str, dict] = {}
+        self.cogs: Dict[str, dict] = {}
+        self._prewarm: Dict[str, asyncio.Future] = {}
+        self._late_tasks = set()
+        self._started = 0.0
+        self._started_at = ""
+
+    async def load_all(self) -> dict:
+        """Грузит все коги из папки; возвращает профиль на момент дедлайна."""
+        self._started = time.perf_counter()
+        self._started_at = datetime.now().isoformat(timespec="seconds")
+        tasks = [
+            asyncio.create_task(self._load(filename), name=f"cog-load:{filename}")
+            for filename in sorted(os.listdir(self.directory)) if filename.endswith(".py")
+        ]
+        if not tasks:
+            return self.profile()
+
+        done, pending = await asyncio.wait(tasks, timeout=self.timeout)
+        for task in pending:
+            entry = self.cogs[task.get_name().split(":", 1)[1]]
+            entry["status"] = "slow"
+            entry["wall"] = time.perf_counter() - self._started
+            task.add_done_callback(self._late_done)
+        profile = self.profile()
+        await asyncio.to_thread(self._write_profile, profile)
+        return profile
+
+    def _prewarm_module(self, name: str) -> asyncio.Future:
+        # Общие зависимости (discord, music.*) импортируются один раз на всех
+        if name not in self._prewarm:
+            if name in sys.modules:
+                future = asyncio.get_running_loop().create_future()
+                future.set_result({"time": 0.0, "error": None})
+            else:
+                future = asyncio.ensure_future(asyncio.to_thread(_import_module, name))
+            self._prewarm[name] = future
+        return self._prewarm[name]
+
+    async def _load(self, filename: str):
+        entry = self.cogs[filename] = {
+            "name": filename,
+            "status": "loading",
+            "imports": [],
+            "import": 0.0,
+            "setup": 0.0,
+            "wall": 0.0,
+            "error": None
+        }
+        try:
+            path = os.path.join(self.directory, filename)
+            entry["imports"] = await asyncio.to_thread(module_imports, path)
+            started = time.perf_counter()
+            results = await asyncio.gather(*(self._prewarm_module(name) for name in entry["imports"]))
+            for name, result in zip(entry["imports"], results):
+                self.modules[name] = result
+            entry["import"] = time.perf_counter() - started
+
+            started = time.perf_counter()
+            await self.bot.load_extension(f"{self.directory}.{filename[:-3]}")
+            entry["setup"] = time.perf_counter() - started
+            entry["status"] = "ok" if entry["status"] == "loading" else "late"
+        except Exception as e:
+            entry["status"] = "failed"
+            entry["error"] = f"{type(e).__name__}: {e}"
+        finally:
+            entry["wall"] = time.perf_counter() - self._started
+
+    def _late_done(self, task: asyncio.Task):
+        entry = self.cogs[task.get_name().split(":", 1)[1]]
+        task = asyncio.create_task(self._report_late(entry))
+        self._late_tasks.add(task)
+        task.add_done_callback(self._late_tasks.discard)
+
+    async def _report_late(self, entry: dict):
+        await asyncio.to_thread(self._write_profile, self.profile())
+        if self.on_late:
+            await self.on_late(entry)
+
+    def profile(self) -> dict:
+        return {
+            "started_at": self._started_at,
+            "total": time.perf_counter() - self._started,
+            "timeout": self.timeout,
+            "cogs": sorted(self.cogs.values(), key=lambda entry: entry["wall"], reverse=True),
+            "modules": dict(sorted(self.modules.items(), key=lambda item: item[1]["time"], reverse=True))
+        }
+
+    def _write_profile(self, profile: dict):
+        os.makedirs(os.path.dirname(self.profile_path), exist_ok=True)
+        tmp_path = f"{self.profile_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(profile, f, ensure_ascii=False, indent=4)
+        os.replace(tmp_path, self.profile_path)
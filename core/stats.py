@@ -0,0 +1,32 @@
+"""Скользящая статистика замеров: среднее и перцентили."""
+from collections import deque
+
+
+def percentile(samples: list, p: float) -> float:
+    """Перцентиль p (0-100) по отсортированной выборке, ближайший ранг."""
+    if not samples:
+        return 0.0
+    index = min(len(samples) - 1, max(0, round(p / 100 * (len(samples) - 1))))
+    return samples[index]
+
+
+class RollingStats:
+    """Последние `size` замеров (в секундах) и сводка по ним."""
+
+    def __init__(self, size: int = 500):
+        self.samples = deque(maxlen=size)
+        self.count = 0
+
+    def add(self, value: float):
+        self.samples.append(value)
+        self.count += 1
+
+    def summary(self) -> dict:
+        ordered = sorted(self.samples)
+        return {
+            "count": self.count,
+            "avg": sum(ordered) / len(ordered) if ordered else 0.0,
+            "p50": percentile(ordered, 50),
+            "p95": percentile(ordered, 95),
+            "max": ordered[-1] if ordered else 0.0
+        }
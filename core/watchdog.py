@@ -0,0 +1,128 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Optional
+
+from core.stats import RollingStats
+
+# Сколько кадров стека сохранять для каждого зависания
+STACK_DEPTH = 12
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def short_path(path: str) -> str:
+    """Путь относительно проекта; для библиотек - только пакет и файл."""
+    if path.startswith(PROJECT_ROOT):
+        return os.path.relpath(path, PROJECT_ROOT)
+    return os.path.join(*path.split(os.sep)[-2:])
+
+
+def task_label(task: Optional[asyncio.Task]) -> str:
+    """Имя задачи и её корутины: для команд и слушателей это их имя."""
+    if task is None:
+        return "вне задач (колбэк цикла)"
+    coro = task.get_coro()
+    qualname = getattr(coro, "__qualname__", type(coro).__name__)
+    return f"{task.get_name()} ({qualname})"
+
+
+class LoopWatchdog:
+    """Сторожевой поток, который ловит блокировки event loop.
+
+    Корутина-пульс отмечается каждые `interval` секунд и заодно меряет
+    задержку цикла. Поток проверяет пульс; если цикл молчит дольше
+    `threshold`, он снимает стек потока цикла (sys._current_frames) и
+    запоминает активную команду или слушателя. Последние зависания
+    доступны через report().
+    """
+
+    def __init__(self, threshold: float = 0.25, interval: float = 0.1, history: int = 50):
+        self.threshold = threshold
+        self.interval = interval
+        self.lag = RollingStats()
+        self.stalls = deque(maxlen=history)
+        self.total_stalls = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._last_beat = time.perf_counter()
+        self._current = None  # зависание, которое идёт прямо сейчас
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._heartbeat_task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Запускает пульс и поток. Вызывать из работающего event loop."""
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.perf_counter()
+        self._heartbeat_task = self._loop.create_task(self._heartbeat(), name="loop-watchdog")
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._heartbeat_task:
+            self._heartbeat_task.cancel()
+
+    async def _heartbeat(self):
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.perf_counter()
+            lag = max(0.0, now - expected)
+            self.lag.add(lag)
+            with self._lock:
+                self._last_beat = now
+                if self._current is not None:
+                    # Цикл ожил: фиксируем настоящую длительность зависания
+                    self._current["duration"] = lag
+                    self._current = None
+
+    def _watch(self):
+        check_every = min(self.interval, self.threshold) / 2
+        while not self._stop.wait(check_every):
+            with self._lock:
+                silent = time.perf_counter() - self._last_beat - self.interval
+                if silent < self.threshold:
+                    continue
+                if self._current is not None:
+                    self._current["duration"] = silent
+                    continue
+                self._current = self._capture(silent)
+                self.stalls.append(self._current)
+                self.total_stalls += 1
+
+    def _capture(self, silent: float) -> dict:
+        """Снимок потока цикла: стек блокирующего вызова и активная задача."""
+        frame = sys._current_frames().get(self._loop_thread_id)
+        stack = traceback.extract_stack(frame)[-STACK_DEPTH:] if frame is not None else []
+        # Блокирующий вызов - самый глубокий кадр из кода проекта, иначе самый глубокий вообще
+        blocking = next(
+            (entry for entry in reversed(stack)
+             if entry.filename.startswith(PROJECT_ROOT) and not entry.filename.startswith(os.path.join(PROJECT_ROOT, "core"))),
+            stack[-1] if stack else None
+        )
+        return {
+            "at": time.time(),
+            "duration": silent,
+            "handler": task_label(asyncio.current_task(self._loop)),
+            "blocking": f"{short_path(blocking.filename)}:{blocking.lineno} in {blocking.name}"
+                        if blocking else "неизвестно",
+            "stack": [f"{short_path(entry.filename)}:{entry.lineno} in {entry.name}: {entry.line}" for entry in stack]
+        }
+
+    def report(self, limit: int = 10) -> dict:
+        """Сводка задержек цикла и последние зависания (новые первыми)."""
+        with self._lock:
+            recent = [dict(stall) for stall in list(self.stalls)[-limit:]][::-1] if limit > 0 else []
+        return {
+            "threshold": self.threshold,
+            "lag": self.lag.summary(),
+            "total_stalls": self.total_stalls,
+            "recent": recent
+        }
@@ -16,6 +16,11 @@ class Levels(commands.Cog):
         
         self.levels_collection.create_index([("user_id", 1)], unique=True)
         self.settings_collection.create_index([("guild_id", 1)], unique=True)
+        # Опыт начисляется только за сообщения людей на серверах - остальные сюда не доходят
+        bot.message_router.register(self.on_guild_message, authors="users", guild_only=True)
+
+    async def cog_unload(self):
+        self.bot.message_router.unregister_owner(self)
 
     def get_guild_settings(self, guild_id):
         settings = self.settings_collection.find_one({"guild_id": guild_id})
@@ -134,11 +139,7 @@ class Levels(commands.Cog):
         else:
             await interaction.response.send_message(f"Канал {channel.mention} уже в списке игнорируемых.")
 
-    @commands.Cog.listener()
-    async def on_message(self, message: discord.Message):
-        if message.author.bot or not message.guild:
-            return
-
+    async def on_guild_message(self, message: discord.Message):
         settings = self.get_guild_settings(message.guild.id)
         if not settings["levels_enabled"]:
             return
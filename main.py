@@ -1,9 +1,14 @@
 import discord
 from discord.ext import commands
-import os
-import json
 import asyncio
 import logging
+from core.command_sync import SYNC_CONCURRENCY, CommandSyncer
+from core.config import ConfigService
+from core.http import HTTPService
+from core.metrics import INSTRUMENTED_EVENTS, InstrumentedCommandTree, MetricsRegistry, MetricsServer, timed_listener
+from core.router import MessageRouter
+from core.startup import COG_LOAD_TIMEOUT, CogLoader
+from core.watchdog import LoopWatchdog
 
 # Настройка логирования только для консоли
 logging.basicConfig(
@@ -11,18 +16,42 @@ logging.basicConfig(
     format='%(asctime)s [%(levelname)s] %(message)s'
 )
 
-# Загрузка конфигурации
-with open('config.json') as config_file:
-    config = json.load(config_file)
+# Загрузка конфигурации: один разбор файла на всех, коги читают её через bot.config
+config = ConfigService()
 
 class MyBot(commands.Bot):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.config = config
         self.logger = logging.getLogger('bot')
+        # Метрики команд и слушателей: /stats и эндпоинт Prometheus
+        self.metrics = MetricsRegistry()
+        self.metrics_server = None
+        # Поиск блокирующих вызовов в event loop (loop_stall_threshold: 0 - выключен)
+        self.watchdog = None
+        # on_message для когов: только подходящим обработчикам (см. core/router.py)
+        self.message_router = MessageRouter(self)
+        # Синхронизация команд только при изменении (data/command_hashes.json)
+        self.command_syncer = None
 
     async def setup_hook(self):
         print("Начало инициализации бота...")
+        # Изменения config.json применяются без перезапуска
+        self.config.start()
+        self.config.subscribe(self.on_guilds_changed, keys=("allowed_guilds",))
+        self.config.subscribe(self.on_stall_threshold_changed, keys=("loop_stall_threshold",))
+        # Общий HTTP-клиент для всех когов (bot.http занят discord.py)
+        self.http_service = HTTPService(
+            limit_per_host=self.config.get("http_limit_per_host", 10),
+            host_limits=self.config.get("http_host_limits", {}),
+            timeout=self.config.get("http_timeout", 15),
+            retries=self.config.get("http_retries", 2)
+        )
+        await self.start_metrics_server()
+        threshold = self.config.get("loop_stall_threshold", 0.25)
+        if threshold:
+            self.watchdog = LoopWatchdog(threshold=threshold)
+            self.watchdog.start()
         try:
             await self.load_cogs()
             await self.sync_commands()
@@ -30,35 +59,97 @@ class MyBot(commands.Bot):
         except Exception as e:
             print(f"Ошибка при инициализации: {e}")
 
+    async def start_metrics_server(self):
+        """Поднимает локальный эндпоинт /metrics (metrics_port: 0 - выключен)."""
+        port = self.config.get("metrics_port", 9108)
+        if not port:
+            return
+        server = MetricsServer(self, self.config.get("metrics_host", "127.0.0.1"), port)
+        try:
+            await server.start()
+            self.metrics_server = server
+            print(f"Метрики доступны на http://{server.host}:{port}/metrics")
+        except OSError as e:
+            print(f"Не удалось запустить эндпоинт метрик: {e}")
+
+    async def on_guilds_changed(self, config):
+        await self.sync_commands()
+
+    def on_stall_threshold_changed(self, config):
+        threshold = config.get("loop_stall_threshold", 0.25)
+        if self.watchdog and threshold:
+            self.watchdog.threshold = threshold
+
+    def dispatch(self, event_name, /, *args, **kwargs):
+        super().dispatch(event_name, *args, **kwargs)
+        if event_name == "message":
+            self.message_router.dispatch(args[0])
+
+    def _schedule_event(self, coro, event_name, *args, **kwargs):
+        if event_name in INSTRUMENTED_EVENTS:
+            coro = timed_listener(self.metrics, coro, event_name)
+        return super()._schedule_event(coro, event_name, *args, **kwargs)
+
     async def load_cogs(self):
-        """Загружает все коги из папки cogs."""
+        """Загружает все коги из папки cogs параллельно; профиль - в data/startup_profile.json."""
         print("Начало загрузки когов...")
+        loader = CogLoader(
+            self,
+            timeout=self.config.get("cog_load_timeout", COG_LOAD_TIMEOUT),
+            on_late=self.on_late_cog
+        )
+        profile = await loader.load_all()
         loaded_cogs = 0
         failed_cogs = 0
-        
-        for filename in os.listdir('./cogs'):
-            if filename.endswith('.py'):
-                try:
-                    await self.load_extension(f'cogs.{filename[:-3]}')
-                    print(f"Загружен ког: {filename}")
-                    loaded_cogs += 1
-                except Exception as e:
-                    print(f"Ошибка загрузки {filename}: {e}")
-                    failed_cogs += 1
-        
-        print(f"Загрузка когов завершена. Успешно: {loaded_cogs}, Ошибок: {failed_cogs}")
+
+        for entry in profile["cogs"]:
+            if entry["status"] == "ok":
+                print(f"Загружен ког: {entry['name']} (импорты {entry['import']:.2f} с, setup {entry['setup']:.2f} с)")
+                loaded_cogs += 1
+            elif entry["status"] == "failed":
+                print(f"Ошибка загрузки {entry['name']}: {entry['error']}")
+                failed_cogs += 1
+            else:
+                print(f"Ког {entry['name']} грузится дольше {loader.timeout} с, продолжаем без него")
+
+        print(f"Загрузка когов завершена за {profile['total']:.2f} с. Успешно: {loaded_cogs}, Ошибок: {failed_cogs}")
+
+    async def on_late_cog(self, entry: dict):
+        """Медленный ког догрузился в фоне: его команды нужно досинхронизировать."""
+        if entry["status"] == "failed":
+            print(f"Ошибка загрузки {entry['name']}: {entry['error']}")
+            return
+        print(f"Загружен ког: {entry['name']} с опозданием ({entry['wall']:.2f} с)")
+        await self.sync_commands()
 
     async def sync_commands(self):
-        """Синхронизирует слэш-команды для всех гильдий."""
+        """Синхронизирует слэш-команды в гильдиях, где они изменились с прошлого запуска."""
         print("Начало синхронизации команд...")
+        if self.command_syncer is None:
+            self.command_syncer = CommandSyncer(
+                self.tree, concurrency=self.config.get("command_sync_concurrency", SYNC_CONCURRENCY)
+            )
         try:
-            for guild_id in self.config.get("allowed_guilds", []):
-                guild = discord.Object(id=guild_id)
-                self.tree.copy_global_to(guild=guild)
-                await self.tree.sync(guild=guild)
-                print(f"Команды синхронизированы для гильдии {guild_id}")
+            result = await self.command_syncer.sync(self.config.get("allowed_guilds", []))
         except Exception as e:
             print(f"Ошибка при синхронизации команд: {e}")
+            return
+        for guild_id in result["synced"]:
+            print(f"Команды синхронизированы для гильдии {guild_id}")
+        for guild_id, error in result["failed"].items():
+            print(f"Ошибка при синхронизации команд гильдии {guild_id}: {error}")
+        if result["skipped"]:
+            print(f"Команды не изменились, синхронизация пропущена для {len(result['skipped'])} гильдий")
+
+    async def close(self):
+        self.config.stop()
+        await super().close()
+        if hasattr(self, "http_service"):
+            await self.http_service.close()
+        if self.metrics_server:
+            await self.metrics_server.close()
+        if self.watchdog:
+            self.watchdog.stop()
 
     async def on_ready(self):
         print(f"Бот {self.user.name} успешно запущен!")
@@ -73,7 +164,7 @@ class MyBot(commands.Bot):
 
 intents = discord.Intents.all()
 intents.message_content = True  # Добавлено для получения содержимого сообщений
-bot = MyBot(command_prefix=commands.when_mentioned, intents=intents)  # Теперь бот реагирует только на @упоминания
+bot = MyBot(command_prefix=commands.when_mentioned, intents=intents, tree_cls=InstrumentedCommandTree)  # Теперь бот реагирует только на @упоминания
 
 async def main():
     async with bot:
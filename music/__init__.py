@@ -0,0 +1 @@
+"""Вспомогательные модули для музыкального кога (cogs/music.py)."""
@@ -0,0 +1,99 @@
+import asyncio
+from collections import deque
+from typing import Awaitable, Callable, Optional
+
+
+class _Command:
+    __slots__ = ('func', 'batch_key', 'future')
+
+    def __init__(self, func, batch_key: Optional[str], future: asyncio.Future):
+        self.func = func
+        self.batch_key = batch_key
+        self.future = future
+
+
+class GuildActor:
+    """Очередь операций с плеером одной гильдии.
+
+    Все операции выполняются строго по одной в порядке поступления, поэтому
+    команды и событие окончания трека не могут одновременно менять очередь
+    и плеер. Разные гильдии работают независимо и параллельно.
+
+    Подряд идущие команды с одинаковым `batch_key` (например, несколько
+    /skip за долю секунды) объединяются: функция вызывается один раз с
+    количеством объединённых команд, результат получают все.
+    """
+
+    def __init__(self, guild_id: int, batch_window: float = 0.05, idle_timeout: float = 60):
+        self.guild_id = guild_id
+        self.batch_window = batch_window
+        self.idle_timeout = idle_timeout
+        self._commands = deque()
+        self._wakeup = asyncio.Event()
+        self._worker: Optional[asyncio.Task] = None
+        self.processed = 0
+        self.batched = 0
+
+    async def run(self, func: Callable[[], Awaitable]):
+        """Выполняет операцию в очереди гильдии и возвращает её результат."""
+        return await self._submit(func, None)
+
+    async def run_batched(self, batch_key: str, func: Callable[[int], Awaitable]):
+        """Как run, но соседние команды с тем же ключом выполняются одним вызовом func(count)."""
+        return await self._submit(func, batch_key)
+
+    async def _submit(self, func, batch_key: Optional[str]):
+        future = asyncio.get_running_loop().create_future()
+        self._commands.append(_Command(func, batch_key, future))
+        self._wakeup.set()
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._work())
+        return await future
+
+    async def _work(self):
+        while True:
+            if not self._commands:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.idle_timeout)
+                except asyncio.TimeoutError:
+                    if not self._commands:
+                        # Простаивающий воркер завершается и создаётся заново при новой команде
+                        return
+                continue
+
+            command = self._commands.popleft()
+            batch = [command]
+            if command.batch_key is not None:
+                # Короткое окно, чтобы собрать команды, отправленные почти одновременно
+                if self.batch_window:
+                    await asyncio.sleep(self.batch_window)
+                while self._commands and self._commands[0].batch_key == command.batch_key:
+                    batch.append(self._commands.popleft())
+
+            try:
+                if command.batch_key is not None:
+                    result = await command.func(len(batch))
+                else:
+                    result = await command.func()
+            except asyncio.CancelledError:
+                for item in batch:
+                    item.future.cancel()
+                raise
+            except Exception as e:
+                for item in batch:
+                    if not item.future.done():
+                        item.future.set_exception(e)
+            else:
+                for item in batch:
+                    if not item.future.done():
+                        item.future.set_result(result)
+
+            self.processed += 1
+            self.batched += len(batch) - 1
+
+    def cancel(self):
+        if self._worker and not self._worker.done():
+            self._worker.cancel()
+        while self._commands:
+            self._commands.popleft().future.cancel()
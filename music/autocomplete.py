@@ -0,0 +1,94 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable
+
+from music.cache import normalize_query
+
+# Discord ждёт ответ на автодополнение не дольше 3 секунд
+AUTOCOMPLETE_DEADLINE = 2.5
+
+
+class SearchSuggester:
+    """Подсказки для поискового поля с дебаунсом, кэшем и объединением запросов.
+
+    - дебаунс по пользователю: пока человек печатает, запросы не уходят;
+    - результаты кэшируются по нормализованному префиксу с TTL;
+    - на один префикс выполняется не больше одного запроса к источнику,
+      даже если его одновременно набирают несколько пользователей;
+    - ответ всегда укладывается в дедлайн Discord, а запоздавший запрос
+      всё равно доходит до кэша.
+    """
+
+    def __init__(self, search: Callable[[str], Awaitable[list]], debounce: float = 0.35,
+                 ttl: int = 600, capacity: int = 1000, min_length: int = 3):
+        self.search = search
+        self.debounce = debounce
+        self.ttl = ttl
+        self.capacity = capacity
+        self.min_length = min_length
+        self._cache = OrderedDict()  # prefix -> (expires_at, choices)
+        self._inflight = {}  # prefix -> asyncio.Task
+        self._latest = {}  # user_id -> последний набранный текст
+
+    def _get_cached(self, prefix: str):
+        entry = self._cache.get(prefix)
+        if entry is None:
+            return None
+        expires_at, choices = entry
+        if expires_at < time.monotonic():
+            del self._cache[prefix]
+            return None
+        self._cache.move_to_end(prefix)
+        return choices
+
+    def _put(self, prefix: str, choices: list):
+        self._cache[prefix] = (time.monotonic() + self.ttl, choices)
+        self._cache.move_to_end(prefix)
+        while len(self._cache) > self.capacity:
+            self._cache.popitem(last=False)
+
+    async def _fetch(self, prefix: str) -> list:
+        try:
+            choices = await self.search(prefix)
+        except Exception as e:
+            print(f"Error in autocomplete search: {e}")
+            return []
+        else:
+            self._put(prefix, choices)
+            return choices
+        finally:
+            self._inflight.pop(prefix, None)
+
+    async def suggest(self, user_id: int, current: str) -> list:
+        prefix = normalize_query(current)
+        if len(prefix) < self.min_length or prefix.startswith("http"):
+            return []
+
+        cached = self._get_cached(prefix)
+        if cached is not None:
+            return cached
+
+        started = time.monotonic()
+        self._latest[user_id] = prefix
+        await asyncio.sleep(self.debounce)
+        # Пользователь продолжил печатать - этот запрос уже не нужен
+        if self._latest.get(user_id) != prefix:
+            return []
+        self._latest.pop(user_id, None)
+
+        # За время дебаунса префикс мог найти другой пользователь
+        cached = self._get_cached(prefix)
+        if cached is not None:
+            return cached
+
+        task = self._inflight.get(prefix)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(prefix))
+            self._inflight[prefix] = task
+
+        remaining = AUTOCOMPLETE_DEADLINE - (time.monotonic() - started)
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), max(remaining, 0.1))
+        except asyncio.TimeoutError:
+            return []
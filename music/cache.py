@@ -0,0 +1,127 @@
+import asyncio
+import json
+import os
+import re
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import wavelink
+
+CACHE_FILE = "data/track_cache.json"
+URL_RE = re.compile(r"^[a-z][a-z0-9+.-]*://", re.IGNORECASE)
+
+
+def normalize_query(query: str) -> str:
+    """Приводит поисковый запрос к виду, одинаковому для похожих запросов."""
+    return re.sub(r"\s+", " ", query).strip().lower()
+
+
+class TrackCache:
+    """LRU-кэш найденных треков Lavalink с TTL и сохранением на диск.
+
+    Хранит сырые данные трека (с encoded-строкой), поэтому трек из кэша
+    восстанавливается без запроса к Lavalink. Ключ - ID трека Spotify
+    (`spotify:<id>`), ссылка как есть (`url:<...>`: ID видео YouTube
+    чувствительны к регистру) или нормализованный поисковый запрос
+    (`query:<...>`).
+    """
+
+    def __init__(self, path: str = CACHE_FILE, capacity: int = 5000, ttl: int = 7 * 24 * 3600):
+        self.path = path
+        self.capacity = capacity
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> [expires_at, raw_data]
+        self._dirty = False
+        self._save_lock = asyncio.Lock()
+        self.load()
+
+    @staticmethod
+    def make_key(query: str, spotify_id: Optional[str] = None) -> str:
+        if spotify_id:
+            return f"spotify:{spotify_id}"
+        query = query.strip()
+        if URL_RE.match(query):
+            return f"url:{query}"
+        return f"query:{normalize_query(query)}"
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        """Есть ли живая запись (без учёта в статистике попаданий)."""
+        entry = self._entries.get(key)
+        return entry is not None and entry[0] >= time.time()
+
+    def get(self, key: str) -> Optional[wavelink.Playable]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, data = entry
+        if expires_at < time.time():
+            del self._entries[key]
+            self._dirty = True
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return wavelink.Playable(data)
+
+    def put(self, key: str, track: wavelink.Playable):
+        self._entries[key] = [time.time() + self.ttl, track.raw_data]
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+        self._dirty = True
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0
+        }
+
+    def load(self):
+        """Загружает кэш с диска, отбрасывая просроченные записи."""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                items = json.load(f)
+        except (json.JSONDecodeError, OSError) as e:
+            print(f"Не удалось загрузить кэш треков: {e}")
+            return
+
+        now = time.time()
+        # Файл хранится от самых старых к самым свежим, как и OrderedDict
+        for key, expires_at, data in items[-self.capacity:]:
+            if expires_at >= now:
+                self._entries[key] = [expires_at, data]
+
+    def _write(self, items: list):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(items, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    async def save(self):
+        """Сохраняет кэш на диск в отдельном потоке, если он изменился."""
+        if not self._dirty:
+            return
+        async with self._save_lock:
+            items = [[key, expires_at, data] for key, (expires_at, data) in self._entries.items()]
+            self._dirty = False
+            try:
+                await asyncio.to_thread(self._write, items)
+            except OSError as e:
+                self._dirty = True
+                print(f"Не удалось сохранить кэш треков: {e}")
@@ -0,0 +1,212 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+import time
+from abc import ABC, abstractmethod
+from typing import Optional
+
+from bs4 import BeautifulSoup
+
+from core.http import HTTPService
+
+LYRICS_DIR = "data/lyrics"
+# Сколько помнить, что текст не найден, чтобы не спрашивать провайдеров снова
+NOT_FOUND_TTL = 24 * 3600
+
+LRC_LINE = re.compile(r"\[(\d+):(\d+(?:\.\d+)?)\]")
+
+
+def parse_lrc(lrc: str) -> list:
+    """Разбирает LRC в список (время в мс, строка), отсортированный по времени."""
+    lines = []
+    for raw_line in lrc.splitlines():
+        stamps = LRC_LINE.findall(raw_line)
+        if not stamps:
+            continue
+        text = LRC_LINE.sub("", raw_line).strip()
+        for minutes, seconds in stamps:
+            lines.append((int((int(minutes) * 60 + float(seconds)) * 1000), text))
+    lines.sort(key=lambda line: line[0])
+    return lines
+
+
+def track_identity(artist: str, title: str) -> str:
+    """Ключ кэша: хэш нормализованных исполнителя и названия."""
+    normalized = f"{artist.strip().lower()}\n{title.strip().lower()}"
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+class Lyrics:
+    """Текст песни: обычный и (если есть) синхронизированный по времени."""
+
+    __slots__ = ('plain', 'synced', 'source', 'url')
+
+    def __init__(self, plain: str, synced: Optional[list] = None, source: str = "", url: Optional[str] = None):
+        self.plain = plain
+        self.synced = synced
+        self.source = source
+        self.url = url
+
+    def to_dict(self) -> dict:
+        return {"plain": self.plain, "synced": self.synced, "source": self.source, "url": self.url}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Lyrics":
+        synced = [tuple(line) for line in data["synced"]] if data.get("synced") else None
+        return cls(data["plain"], synced, data.get("source", ""), data.get("url"))
+
+    def line_index(self, position: int) -> int:
+        """Индекс строки, которая звучит на позиции position (мс), или -1."""
+        index = -1
+        for i, (start, _) in enumerate(self.synced or []):
+            if start > position:
+                break
+            index = i
+        return index
+
+
+class LyricsProvider(ABC):
+    """Базовый класс источника текстов песен."""
+
+    name = "base"
+
+    @abstractmethod
+    async def fetch(self, http: HTTPService, artist: str, title: str,
+                    duration_ms: int = 0) -> Optional[Lyrics]:
+        """Текст песни или None, если источник его не нашёл."""
+
+
+class LrcLibProvider(LyricsProvider):
+    """lrclib.net - бесплатный источник, часто с синхронизированным текстом."""
+
+    name = "LRCLIB"
+    API_URL = "https://lrclib.net/api"
+
+    async def fetch(self, http, artist, title, duration_ms=0):
+        params = {"track_name": title}
+        if artist:
+            params["artist_name"] = artist
+        if duration_ms:
+            params["duration"] = str(duration_ms // 1000)
+
+        data = None
+        if artist:
+            response = await http.request("GET", f"{self.API_URL}/get", params=params, raise_for_status=False)
+            if response.status == 200:
+                data = response.data
+        if data is None:
+            # Точного совпадения нет - берём первый результат поиска
+            query = f"{artist} {title}".strip()
+            results = await http.get_json(f"{self.API_URL}/search", params={"q": query})
+            data = results[0] if results else None
+        if not data or not (data.get("plainLyrics") or data.get("syncedLyrics")):
+            return None
+
+        synced = parse_lrc(data["syncedLyrics"]) if data.get("syncedLyrics") else None
+        plain = data.get("plainLyrics") or "\n".join(text for _, text in synced or [])
+        return Lyrics(plain, synced or None, self.name)
+
+
+class GeniusProvider(LyricsProvider):
+    """Genius: поиск через API (нужен genius_token), текст - со страницы песни."""
+
+    name = "Genius"
+    API_URL = "https://api.genius.com"
+
+    def __init__(self, token: str):
+        self.token = token
+
+    async def fetch(self, http, artist, title, duration_ms=0):
+        headers = {"Authorization": f"Bearer {self.token}"}
+        query = f"{artist} {title}".strip()
+        data = await http.get_json(f"{self.API_URL}/search", params={"q": query}, headers=headers)
+        hits = data["response"]["hits"]
+        if not hits:
+            return None
+
+        url = hits[0]["result"]["url"]
+        html = await http.get_text(url)
+
+        soup = BeautifulSoup(html, "html.parser")
+        containers = soup.find_all("div", attrs={"data-lyrics-container": "true"})
+        if not containers:
+            return None
+        plain = "\n".join(container.get_text(separator="\n").strip() for container in containers)
+        return Lyrics(plain, None, self.name, url)
+
+
+class LyricsCache:
+    """Кэш текстов на диске, адресуемый хэшем трека (data/lyrics/ab/abcdef....json)."""
+
+    def __init__(self, path: str = LYRICS_DIR):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+
+    def _file(self, key: str) -> str:
+        return os.path.join(self.path, key[:2], f"{key}.json")
+
+    def _read(self, key: str):
+        try:
+            with open(self._file(key), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def _write(self, key: str, data: dict):
+        path = self._file(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    async def get(self, key: str):
+        """(найдено ли в кэше, Lyrics или None для сохранённого "не найдено")."""
+        data = await asyncio.to_thread(self._read, key)
+        if data is None or (data.get("lyrics") is None and data.get("expires_at", 0) < time.time()):
+            self.misses += 1
+            return False, None
+        self.hits += 1
+        return True, Lyrics.from_dict(data["lyrics"]) if data.get("lyrics") else None
+
+    async def put(self, key: str, lyrics: Optional[Lyrics]):
+        data = {"lyrics": lyrics.to_dict() if lyrics else None}
+        if lyrics is None:
+            data["expires_at"] = time.time() + NOT_FOUND_TTL
+        await asyncio.to_thread(self._write, key, data)
+
+
+class LyricsService:
+    """Поиск текстов: кэш на диске, затем провайдеры по порядку."""
+
+    def __init__(self, http: HTTPService, providers: list, cache: Optional[LyricsCache] = None):
+        self.http = http
+        self.providers = providers
+        self.cache = cache or LyricsCache()
+
+    async def get(self, artist: str, title: str, duration_ms: int = 0) -> Optional[Lyrics]:
+        key = track_identity(artist, title)
+        found, lyrics = await self.cache.get(key)
+        if found:
+            return lyrics
+
+        lyrics = None
+        failed = False
+        for provider in self.providers:
+            try:
+                lyrics = await provider.fetch(self.http, artist, title, duration_ms)
+            except Exception as e:
+                print(f"Ошибка провайдера текстов {provider.name}: {e}")
+                failed = True
+                continue
+            if lyrics:
+                break
+
+        # "Не найдено" запоминаем, только если ответили все провайдеры:
+        # после сетевой ошибки следующий запрос должен спросить их снова
+        if lyrics or not failed:
+            await self.cache.put(key, lyrics)
+        return lyrics
@@ -0,0 +1,109 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from music.cache import normalize_query
+
+# Максимум ID в одном запросе sp.tracks
+TRACKS_BATCH_SIZE = 50
+
+
+class SpotifyMetadata:
+    """Метаданные треков Spotify поверх асинхронного SpotifyClient.
+
+    Метаданные кэшируются по названию, одновременные запросы одного и
+    того же названия объединяются в один.
+    """
+
+    def __init__(self, sp, capacity: int = 2000, ttl: int = 24 * 3600):
+        self.sp = sp
+        self.capacity = capacity
+        self.ttl = ttl
+        self._cache = OrderedDict()  # title -> (expires_at, info | None)
+        self._inflight = {}  # title -> asyncio.Future
+
+    async def track_isrcs(self, track_ids: list) -> dict:
+        """ISRC треков по их ID Spotify: пачками по TRACKS_BATCH_SIZE через sp.tracks."""
+        batches = [track_ids[i:i + TRACKS_BATCH_SIZE] for i in range(0, len(track_ids), TRACKS_BATCH_SIZE)]
+        results = await asyncio.gather(
+            *(self.sp.tracks(batch) for batch in batches),
+            return_exceptions=True
+        )
+        isrcs = {}
+        for result in results:
+            if isinstance(result, Exception):
+                # Без ISRC треки просто найдутся текстовым поиском
+                print(f"Error fetching Spotify ISRCs: {result}")
+                continue
+            for track in result['tracks']:
+                if track and track.get('external_ids', {}).get('isrc'):
+                    isrcs[track['id']] = track['external_ids']['isrc']
+        return isrcs
+
+    def _get_cached(self, key: str):
+        entry = self._cache.get(key)
+        if entry is None:
+            return False, None
+        expires_at, info = entry
+        if expires_at < time.time():
+            del self._cache[key]
+            return False, None
+        self._cache.move_to_end(key)
+        return True, info
+
+    def _put(self, key: str, info: Optional[dict]):
+        self._cache[key] = (time.time() + self.ttl, info)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.capacity:
+            self._cache.popitem(last=False)
+
+    async def track_info(self, track_title: str) -> Optional[dict]:
+        """Информация о треке из Spotify по названию (с кэшем и объединением запросов)."""
+        key = normalize_query(track_title)
+        found, info = self._get_cached(key)
+        if found:
+            return info
+
+        future = self._inflight.get(key)
+        if future is not None:
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                # Отменили исходный запрос, а не нас - просто нет данных
+                if future.cancelled():
+                    return None
+                raise
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            info = await self._fetch_track_info(track_title)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            # Ошибку сети не кэшируем: следующий запрос попробует снова
+            print(f"Error fetching Spotify info: {e}")
+            info = None
+        else:
+            # Пустой ответ кэшируем, чтобы не спрашивать Spotify снова
+            self._put(key, info)
+        finally:
+            del self._inflight[key]
+
+        future.set_result(info)
+        return info
+
+    async def _fetch_track_info(self, track_title: str) -> Optional[dict]:
+        results = await self.sp.search(q=track_title, type='track', limit=1)
+        if not results['tracks']['items']:
+            return None
+        track = results['tracks']['items'][0]
+        return {
+            'title': track['name'],
+            'artist': track['artists'][0]['name'],
+            'album': track['album']['name'],
+            'cover_url': track['album']['images'][0]['url'] if track['album']['images'] else None,
+            'spotify_url': track['external_urls']['spotify']
+        }
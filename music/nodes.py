@@ -0,0 +1,81 @@
+from typing import Optional
+
+import wavelink
+
+# Сколько раз переподключаться к недоступному узлу (None в wavelink - бесконечно)
+NODE_RETRIES = 5
+
+
+def build_nodes(config: dict) -> list:
+    """Создаёт узлы Lavalink из конфига.
+
+    Поддерживается список `lavalink_nodes`; если его нет, используется
+    старый формат с одним узлом (`lavalink_host`, `lavalink_port`, ...).
+    Число попыток подключения ограничено (`retries` узла или
+    `lavalink_retries`), чтобы мёртвый узел не переподключался вечно.
+    """
+    nodes_config = config.get("lavalink_nodes")
+    if not nodes_config:
+        nodes_config = [{
+            "identifier": "main",
+            "host": config.get("lavalink_host"),
+            "port": config.get("lavalink_port"),
+            "password": config.get("lavalink_password"),
+            "secure": config.get("lavalink_secure")
+        }]
+
+    nodes = []
+    for index, node_config in enumerate(nodes_config):
+        scheme = "https" if node_config.get("secure") else "http"
+        nodes.append(wavelink.Node(
+            identifier=node_config.get("identifier") or f"node-{index}",
+            uri=f'{scheme}://{node_config["host"]}:{node_config["port"]}',
+            password=node_config["password"],
+            retries=node_config.get("retries", config.get("lavalink_retries", NODE_RETRIES))
+        ))
+    return nodes
+
+
+def node_penalty(stats) -> float:
+    """Оценка нагрузки узла по его статистике: чем меньше, тем лучше.
+
+    Формула как в распространённых клиентах Lavalink: играющие плееры,
+    экспоненциальный штраф за загрузку CPU и за недоданные/пустые кадры.
+    """
+    penalty = stats.playing
+    penalty += 1.05 ** (100 * stats.cpu.system_load) * 10 - 10
+    if stats.frames:
+        penalty += 1.03 ** (500 * (stats.frames.deficit / 3000)) * 600 - 600
+        penalty += (1.03 ** (500 * (stats.frames.nulled / 3000)) * 300 - 300) * 2
+    return penalty
+
+
+class NodeBalancer:
+    """Выбор наименее нагруженного узла Lavalink для новых плееров."""
+
+    def __init__(self):
+        self.penalties = {}  # identifier -> штраф по последней статистике
+
+    def connected_nodes(self) -> list:
+        return [node for node in wavelink.Pool.nodes.values()
+                if node.status is wavelink.NodeStatus.CONNECTED]
+
+    async def refresh(self):
+        """Обновляет статистику всех подключённых узлов."""
+        for node in self.connected_nodes():
+            try:
+                stats = await node.fetch_stats()
+            except Exception as e:
+                print(f"Не удалось получить статистику узла {node.identifier}: {e}")
+                self.penalties.pop(node.identifier, None)
+                continue
+            self.penalties[node.identifier] = node_penalty(stats)
+
+    def best_node(self, exclude: Optional[wavelink.Node] = None) -> Optional[wavelink.Node]:
+        """Узел с наименьшей нагрузкой или None, если подключённых узлов нет."""
+        nodes = [node for node in self.connected_nodes()
+                 if exclude is None or node.identifier != exclude.identifier]
+        if not nodes:
+            return None
+        # Пока статистики нет, ориентируемся на число наших плееров на узле
+        return min(nodes, key=lambda n: (self.penalties.get(n.identifier, 0), len(n.players)))
@@ -0,0 +1,206 @@
+import random
+from typing import Iterator, Optional
+
+from music.resolver import PendingTrack
+
+
+class QueueEntry:
+    """Элемент очереди: трек (или заглушка PendingTrack) и метаданные Spotify."""
+
+    __slots__ = ('track', 'info', 'offset')
+
+    def __init__(self, track, info: Optional[dict] = None):
+        self.track = track
+        self.info = info
+        self.offset = 0  # суммарная длительность всего, что стоит перед элементом (мс)
+
+    @property
+    def title(self) -> str:
+        return self.track.title
+
+    @property
+    def length(self) -> int:
+        """Длительность в миллисекундах (для заглушек - по данным Spotify)."""
+        return self.track.length or 0
+
+    @property
+    def pending(self) -> bool:
+        return isinstance(self.track, PendingTrack)
+
+    def __repr__(self) -> str:
+        return f"<QueueEntry track={self.track!r}>"
+
+
+# Снятые с головы ячейки списка вырезаются, когда их больше этого числа и больше половины списка
+COMPACT_THRESHOLD = 64
+
+
+class GuildQueue:
+    """Очередь воспроизведения одной гильдии: список со смещением головы.
+
+    Переход к следующему треку (сдвиг головы) и добавление в конец -
+    O(1) (амортизированно: снятые элементы вырезаются пачкой), доступ к
+    любой позиции и peek - O(1), страница очереди - O(размер страницы)
+    при любом её номере. Вставка в начало, удаление и перемещение из
+    середины - O(n), как у списка. Общая длительность очереди
+    поддерживается инкрементально.
+
+    `version` увеличивается при каждом изменении очереди - по нему
+    можно дёшево понять, что очередь не менялась.
+
+    Для оценки "через сколько начнётся трек" у каждого элемента хранится
+    смещение `offset`. Добавление в конец и переход к следующему треку
+    сохраняют смещения верными за O(1); перестановки помечают их
+    устаревшими, и они пересчитываются одним проходом при следующем
+    запросе.
+    """
+
+    def __init__(self):
+        self._entries = []
+        self._head = 0  # индекс первого элемента очереди в _entries
+        self.total_duration = 0  # мс
+        self.version = 0
+        self._tail_offset = 0  # смещение, которое получит следующий элемент в конце
+        self._offsets_dirty = False
+
+    def __len__(self) -> int:
+        return len(self._entries) - self._head
+
+    def __bool__(self) -> bool:
+        return len(self._entries) > self._head
+
+    def __iter__(self) -> Iterator[QueueEntry]:
+        entries = self._entries
+        return (entries[i] for i in range(self._head, len(entries)))
+
+    def __contains__(self, entry: QueueEntry) -> bool:
+        return any(item is entry for item in self)
+
+    def __getitem__(self, index: int) -> QueueEntry:
+        return self._entries[self._check_index(index)]
+
+    def _check_index(self, index: int) -> int:
+        """Позиция в очереди -> индекс в _entries."""
+        # Отрицательные индексы не поддерживаем: позиции приходят от пользователей
+        if not 0 <= index < len(self):
+            raise IndexError("queue index out of range")
+        return self._head + index
+
+    def _compact(self):
+        """Вырезает снятые с головы ячейки; каждая вырезается один раз, поэтому в среднем O(1)."""
+        if self._head > COMPACT_THRESHOLD and self._head * 2 > len(self._entries):
+            del self._entries[:self._head]
+            self._head = 0
+
+    def append(self, entry: QueueEntry):
+        entry.offset = self._tail_offset
+        self._tail_offset += entry.length
+        self._entries.append(entry)
+        self.total_duration += entry.length
+        self.version += 1
+
+    def appendleft(self, entry: QueueEntry):
+        if self._head:
+            # Свободная ячейка перед головой - O(1)
+            self._head -= 1
+            self._entries[self._head] = entry
+        else:
+            self._entries.insert(0, entry)
+        self.total_duration += entry.length
+        self.version += 1
+        self._offsets_dirty = True
+
+    def popleft(self) -> Optional[QueueEntry]:
+        """Снимает первый элемент очереди (O(1)) или возвращает None."""
+        if not self:
+            return None
+        entry = self._entries[self._head]
+        self._entries[self._head] = None  # не держим ссылку на сыгранный трек
+        self._head += 1
+        self._compact()
+        self.total_duration -= entry.length
+        self.version += 1
+        return entry
+
+    def peek(self, index: int = 0) -> Optional[QueueEntry]:
+        """Элемент по индексу без удаления (O(1)) или None, если его нет."""
+        if 0 <= index < len(self):
+            return self._entries[self._head + index]
+        return None
+
+    def page(self, start: int, count: int) -> list:
+        """Срез очереди [start, start + count) за O(count) при любом start."""
+        start = self._head + max(start, 0)
+        return self._entries[start:start + max(count, 0)]
+
+    def remove(self, index: int) -> QueueEntry:
+        position = self._check_index(index)
+        entry = self._entries[position]
+        del self._entries[position]
+        self.total_duration -= entry.length
+        self.version += 1
+        self._offsets_dirty = True
+        return entry
+
+    def discard(self, entry: QueueEntry) -> bool:
+        """Удаляет конкретный элемент (по идентичности), если он ещё в очереди."""
+        for index in range(self._head, len(self._entries)):
+            if self._entries[index] is entry:
+                del self._entries[index]
+                self.total_duration -= entry.length
+                self.version += 1
+                self._offsets_dirty = True
+                return True
+        return False
+
+    def move(self, from_index: int, to_index: int) -> QueueEntry:
+        source = self._check_index(from_index)
+        target = self._check_index(to_index)
+        entry = self._entries[source]
+        del self._entries[source]
+        self._entries.insert(target, entry)
+        self.version += 1
+        self._offsets_dirty = True
+        return entry
+
+    def resolve(self, entry: QueueEntry, track):
+        """Заменяет заглушку в элементе найденным треком."""
+        delta = (track.length or 0) - entry.length
+        self.total_duration += delta
+        entry.track = track
+        self.version += 1
+        if delta:
+            if self and entry is self._entries[-1]:
+                self._tail_offset += delta
+            else:
+                self._offsets_dirty = True
+
+    def shuffle(self):
+        entries = self._entries[self._head:]
+        random.shuffle(entries)
+        self._entries = entries
+        self._head = 0
+        self.version += 1
+        self._offsets_dirty = True
+
+    def clear(self):
+        self._entries = []
+        self._head = 0
+        self.total_duration = 0
+        self.version += 1
+        self._tail_offset = 0
+        self._offsets_dirty = False
+
+    def _rebuild_offsets(self):
+        offset = 0
+        for entry in self:
+            entry.offset = offset
+            offset += entry.length
+        self._tail_offset = offset
+        self._offsets_dirty = False
+
+    def start_time(self, index: int) -> int:
+        """Через сколько мс от начала очереди начнётся элемент с индексом index."""
+        if self._offsets_dirty:
+            self._rebuild_offsets()
+        return self[index].offset - self._entries[self._head].offset
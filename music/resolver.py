@@ -0,0 +1,167 @@
+import asyncio
+import re
+from typing import Awaitable, Callable, Optional
+
+import wavelink
+
+from music.cache import TrackCache, normalize_query
+
+# Колбэк прогресса: (сколько запросов завершено, сколько найдено, всего)
+ProgressCallback = Callable[[int, int, int], Awaitable[None]]
+# Сколько результатов поиска по ISRC проверять на совпадение
+ISRC_CANDIDATES = 5
+
+
+def title_matches(expected: str, candidate: str) -> bool:
+    """Похоже ли название найденного трека на ожидаемое.
+
+    Сравнивается основная часть названия Spotify, без "(feat. ...)" и
+    " - Remastered": она должна входить в название видео.
+    """
+    core = re.split(r" - |\(|\[", expected, maxsplit=1)[0]
+    core = normalize_query(core)
+    return bool(core) and core in normalize_query(candidate)
+
+
+class TrackResolver:
+    """Параллельный поиск треков Spotify через Lavalink.
+
+    Поиск идёт одновременно, но не более `concurrency` запросов сразу.
+    Результаты отдаются строго в исходном порядке Spotify: трек выдаётся,
+    как только найдены все треки перед ним.
+
+    Если известен ISRC, сначала ищется по нему, текстовый поиск - запасной
+    вариант. В `matches` считается, каким способом находились треки.
+    """
+
+    def __init__(self, concurrency: int = 8, cache: Optional[TrackCache] = None):
+        self.concurrency = max(1, concurrency)
+        self.cache = cache
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        # isrc - найден по ISRC, text - текстом с похожим названием,
+        # text_mismatch - текстом, но название не совпало (вероятно, не тот трек)
+        self.matches = {"isrc": 0, "text": 0, "text_mismatch": 0, "not_found": 0}
+
+    async def search(self, query: str, spotify_id: Optional[str] = None, isrc: Optional[str] = None,
+                     title: Optional[str] = None) -> Optional[wavelink.Playable]:
+        """Ищет один трек, соблюдая общий лимит параллельности.
+
+        Если задан кэш, сначала проверяет его по ID Spotify или запросу.
+        """
+        key = None
+        if self.cache is not None:
+            key = TrackCache.make_key(query, spotify_id)
+            track = self.cache.get(key)
+            if track is not None:
+                return track
+
+        track = await self._search_isrc(isrc, title) if isrc else None
+        if track is not None:
+            self.matches["isrc"] += 1
+        else:
+            async with self._semaphore:
+                results = await wavelink.Playable.search(query)
+            if not results:
+                self.matches["not_found"] += 1
+                return None
+            track = results[0]
+            if title and not title_matches(title, track.title):
+                self.matches["text_mismatch"] += 1
+            else:
+                self.matches["text"] += 1
+
+        if key is not None:
+            self.cache.put(key, track)
+        return track
+
+    async def _search_isrc(self, isrc: str, title: Optional[str]) -> Optional[wavelink.Playable]:
+        """Поиск по ISRC. Результат принимается, только если он подтверждается."""
+        async with self._semaphore:
+            results = await wavelink.Playable.search(f'"{isrc}"')
+        if not results or isinstance(results, wavelink.Playlist):
+            return None
+
+        candidates = results[:ISRC_CANDIDATES]
+        for track in candidates:
+            if track.isrc and track.isrc.upper() == isrc.upper():
+                return track
+        # YouTube обычно не отдаёт ISRC - тогда проверяем название
+        if title:
+            for track in candidates:
+                if title_matches(title, track.title):
+                    return track
+        return None
+
+    def match_accuracy(self) -> float:
+        """Доля найденных треков, название которых подтвердилось."""
+        found = self.matches["isrc"] + self.matches["text"] + self.matches["text_mismatch"]
+        return (self.matches["isrc"] + self.matches["text"]) / found if found else 0.0
+
+    async def _search_indexed(self, index: int, track_info: dict):
+        try:
+            return index, await self.search(
+                track_info['query'], track_info.get('spotify_id'), track_info.get('isrc'), track_info['title']
+            )
+        except Exception as e:
+            print(f"Error adding track {track_info['title']}: {e}")
+            return index, None
+
+    async def resolve_ordered(self, tracks_info: list, on_progress: Optional[ProgressCallback] = None):
+        """Асинхронный генератор пар (track, track_info) в исходном порядке.
+
+        Не найденные треки пропускаются. `on_progress` вызывается после
+        каждой порции завершённых запросов.
+        """
+        total = len(tracks_info)
+        pending = {
+            asyncio.ensure_future(self._search_indexed(i, info))
+            for i, info in enumerate(tracks_info)
+        }
+        ready = {}
+        next_index = 0
+        done = 0
+        found = 0
+
+        try:
+            while pending:
+                finished, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in finished:
+                    index, track = task.result()
+                    ready[index] = track
+                    done += 1
+                    if track:
+                        found += 1
+
+                if on_progress:
+                    await on_progress(done, found, total)
+
+                # Отдаём только непрерывный префикс, чтобы сохранить порядок
+                while next_index in ready:
+                    track = ready.pop(next_index)
+                    if track:
+                        yield track, tracks_info[next_index]
+                    next_index += 1
+        finally:
+            for task in pending:
+                task.cancel()
+
+
+class PendingTrack:
+    """Лёгкая заглушка трека в очереди, который ещё не найден в Lavalink.
+
+    Хранит только поисковый запрос; сам поиск выполняется, когда заглушка
+    оказывается рядом с текущей позицией воспроизведения.
+    """
+
+    __slots__ = ('query', 'spotify_id', 'isrc', 'title', 'author', 'length')
+
+    def __init__(self, track_info: dict):
+        self.query = track_info['query']
+        self.spotify_id = track_info.get('spotify_id')
+        self.isrc = track_info.get('isrc')
+        self.title = track_info['title']
+        self.author = track_info.get('artist')
+        self.length = track_info.get('duration_ms', 0)
+
+    def __repr__(self) -> str:
+        return f"<PendingTrack query={self.query!r}>"
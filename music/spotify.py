@@ -0,0 +1,148 @@
+import asyncio
+import time
+from typing import Optional
+
+import aiohttp
+
+from core.http import MAX_RETRY_AFTER, HTTPService
+
+API_URL = "https://api.spotify.com/v1"
+TOKEN_URL = "https://accounts.spotify.com/api/token"
+# Обновляем токен заранее, чтобы запрос не упал на границе срока действия
+TOKEN_REFRESH_MARGIN = 60
+# Сколько раз повторять запрос при 429/5xx/сетевых ошибках
+MAX_RETRIES = 4
+
+
+class SpotifyError(Exception):
+    """Ошибка Spotify Web API."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(f"Spotify API {status}: {message}")
+        self.status = status
+
+
+class SpotifyClient:
+    """Асинхронный клиент Spotify Web API (client credentials).
+
+    Запросы идут через общий HTTPService бота (пул соединений и лимит на
+    хост), токен обновляется заранее и только одним запросом, 429
+    обрабатывается по Retry-After. Методы повторяют вызовы spotipy,
+    которые использует музыкальный ког.
+    """
+
+    def __init__(self, client_id: str, client_secret: str, http: HTTPService,
+                 api_url: str = API_URL, token_url: str = TOKEN_URL):
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.http = http
+        self.api_url = api_url
+        self.token_url = token_url
+        self.requests = 0
+        self.rate_limited = 0
+        self._token: Optional[str] = None
+        self._token_expires_at = 0.0
+        self._token_lock = asyncio.Lock()
+
+    async def _get_token(self, force: bool = False) -> str:
+        if not force and self._token and time.monotonic() < self._token_expires_at - TOKEN_REFRESH_MARGIN:
+            return self._token
+
+        async with self._token_lock:
+            # Пока ждали блокировку, токен мог обновить другой запрос
+            if not force and self._token and time.monotonic() < self._token_expires_at - TOKEN_REFRESH_MARGIN:
+                return self._token
+
+            auth = aiohttp.BasicAuth(self.client_id, self.client_secret)
+            response = await self.http.request(
+                "POST", self.token_url, data={"grant_type": "client_credentials"}, auth=auth,
+                retries=1, raise_for_status=False
+            )
+            if response.status != 200:
+                raise SpotifyError(response.status, str(response.data))
+            data = response.data
+
+            self._token = data["access_token"]
+            self._token_expires_at = time.monotonic() + data.get("expires_in", 3600)
+            return self._token
+
+    async def _get(self, url: str, params: Optional[dict] = None) -> dict:
+        """GET с авторизацией и повторами. url - путь API или полная ссылка (next)."""
+        if not url.startswith("http"):
+            url = f"{self.api_url}{url}"
+
+        token_refreshed = False
+        for attempt in range(MAX_RETRIES + 1):
+            headers = {"Authorization": f"Bearer {await self._get_token()}"}
+            try:
+                # Повторы делаем сами: 401 и 429 у Spotify требуют своей обработки
+                response = await self.http.request(
+                    "GET", url, params=params, headers=headers, retries=0, raise_for_status=False
+                )
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                if attempt >= MAX_RETRIES:
+                    raise
+                await asyncio.sleep(0.5 * 2 ** attempt)
+                continue
+
+            self.requests += 1
+            if response.status == 200:
+                return response.data
+
+            if response.status == 401 and not token_refreshed:
+                # Токен отозвали раньше срока - получаем новый и повторяем
+                token_refreshed = True
+                await self._get_token(force=True)
+                continue
+            if response.status == 429 and attempt < MAX_RETRIES:
+                self.rate_limited += 1
+                retry_after = response.headers.get("Retry-After")
+                try:
+                    delay = float(retry_after) if retry_after else 1.0
+                except ValueError:
+                    # Retry-After может быть датой - ждём как при 5xx
+                    delay = 0.5 * 2 ** attempt
+                if delay > MAX_RETRY_AFTER:
+                    # Spotify просит ждать минуты или часы - команда не должна висеть столько
+                    raise SpotifyError(429, f"rate limited, retry after {delay:.0f} s")
+                await asyncio.sleep(delay)
+                continue
+            if response.status >= 500 and attempt < MAX_RETRIES:
+                await asyncio.sleep(0.5 * 2 ** attempt)
+                continue
+
+            try:
+                message = response.data["error"]["message"]
+            except (KeyError, TypeError):
+                message = str(response.data)
+            raise SpotifyError(response.status, message)
+
+        raise SpotifyError(0, f"request to {url} failed after {MAX_RETRIES} retries")
+
+    async def search(self, q: str, limit: int = 10, type: str = "track") -> dict:
+        return await self._get("/search", {"q": q, "limit": limit, "type": type})
+
+    async def playlist_tracks(self, playlist_id: str, limit: int = 100, offset: int = 0) -> dict:
+        return await self._get(f"/playlists/{playlist_id}/tracks", {"limit": limit, "offset": offset})
+
+    async def album_tracks(self, album_id: str, limit: int = 50, offset: int = 0) -> dict:
+        return await self._get(f"/albums/{album_id}/tracks", {"limit": limit, "offset": offset})
+
+    async def album(self, album_id: str) -> dict:
+        return await self._get(f"/albums/{album_id}")
+
+    async def tracks(self, track_ids: list) -> dict:
+        return await self._get("/tracks", {"ids": ",".join(track_ids)})
+
+    async def next(self, results: dict) -> Optional[dict]:
+        """Следующая страница результатов или None."""
+        if not results.get("next"):
+            return None
+        return await self._get(results["next"])
+
+    async def paginate(self, results: dict):
+        """Асинхронный генератор элементов всех страниц, начиная с results."""
+        while results:
+            for item in results["items"]:
+                yield item
+            results = await self.next(results)
@@ -0,0 +1,98 @@
+import asyncio
+import json
+import os
+import wavelink
+
+from music.queue import QueueEntry
+from music.resolver import PendingTrack
+
+STATE_DIR = "data/music_state"
+
+
+def serialize_entry(entry: QueueEntry) -> dict:
+    """Компактное представление элемента очереди для снимка."""
+    if entry.pending:
+        return {"i": entry.info}
+    data = {"t": entry.track.raw_data}
+    if entry.info:
+        data["i"] = entry.info
+    return data
+
+
+def deserialize_entry(data: dict) -> QueueEntry:
+    """Восстанавливает элемент очереди без запросов к Lavalink."""
+    info = data.get("i")
+    if "t" in data:
+        return QueueEntry(wavelink.Playable(data["t"]), info)
+    return QueueEntry(PendingTrack(info), info)
+
+
+class PlayerStateStore:
+    """Снимки состояния плееров на диске.
+
+    Очередь, текущий трек и настройки гильдии лежат в отдельном файле на
+    гильдию и перезаписываются только при изменениях. Позиции, которые
+    меняются постоянно, хранятся в одном маленьком общем файле.
+    """
+
+    def __init__(self, path: str = STATE_DIR):
+        self.path = path
+        self._lock = asyncio.Lock()
+
+    def _guild_path(self, guild_id: int) -> str:
+        return os.path.join(self.path, f"{guild_id}.json")
+
+    def _positions_path(self) -> str:
+        return os.path.join(self.path, "positions.json")
+
+    def _write(self, path: str, data):
+        os.makedirs(self.path, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, path)
+
+    def _remove(self, guild_id: int):
+        try:
+            os.remove(self._guild_path(guild_id))
+        except FileNotFoundError:
+            pass
+
+    def load_all(self) -> dict:
+        """Все сохранённые снимки: guild_id -> снимок (с позицией, если есть)."""
+        if not os.path.isdir(self.path):
+            return {}
+
+        positions = {}
+        try:
+            with open(self._positions_path(), "r", encoding="utf-8") as f:
+                positions = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            pass
+
+        snapshots = {}
+        for filename in os.listdir(self.path):
+            name, ext = os.path.splitext(filename)
+            if ext != ".json" or not name.isdigit():
+                continue
+            try:
+                with open(os.path.join(self.path, filename), "r", encoding="utf-8") as f:
+                    snapshot = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"Не удалось прочитать снимок плеера {filename}: {e}")
+                continue
+            snapshot["position"] = positions.get(name, snapshot.get("position", 0))
+            snapshots[int(name)] = snapshot
+        return snapshots
+
+    async def save_guild(self, guild_id: int, snapshot: dict):
+        async with self._lock:
+            await asyncio.to_thread(self._write, self._guild_path(guild_id), snapshot)
+
+    async def save_positions(self, positions: dict):
+        async with self._lock:
+            await asyncio.to_thread(self._write, self._positions_path(), {str(k): v for k, v in positions.items()})
+
+    async def delete(self, guild_id: int):
+        async with self._lock:
+            await asyncio.to_thread(self._remove, guild_id)